@@ -1,10 +1,14 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
+from typing import TYPE_CHECKING
+from utils.config import load_env
+from utils.llm_clients import get_chat_model
+from utils.llm_gateway import get_gateway
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 # Load environment variables from .env if present
-load_dotenv()
+load_env()
 
 # LangSmith tracing setup (uses env vars if available)
 os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
@@ -13,20 +17,22 @@ if os.getenv("LANGSMITH_API_KEY") and not os.getenv("LANGCHAIN_API_KEY"):
     os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGSMITH_API_KEY", "")
 
 
-def _get_llm() -> ChatOpenAI:
-    """Create and return a ChatOpenAI client using environment configuration."""
+def _get_llm() -> "ChatOpenAI":
+    """Return the shared ChatOpenAI client using environment configuration."""
+    from pydantic import SecretStr
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError(
             "Missing OPENAI_API_KEY in environment. Set it in .env or system env."
         )
-    return ChatOpenAI(model="gpt-4o-mini", api_key=SecretStr(api_key))
+    return get_chat_model(model="gpt-4o-mini", api_key=SecretStr(api_key))
 
 
 def hello_agent(prompt: str | None = None) -> str:
     llm = _get_llm()
     query = prompt or "Hello, I am testing my agent setup."
-    msg = llm.invoke(query)
+    msg = get_gateway().invoke(llm, query)
     # `invoke` returns an AIMessage; extract the text content
     return getattr(msg, "content", str(msg))
 
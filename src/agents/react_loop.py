@@ -1,48 +1,161 @@
 import json
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from typing import Any, Dict, List
 from tools.calendar import read_calendar
 from tools.contact import lookup_contact
-from langchain_openai import ChatOpenAI
+from tools.cache import ToolCache, tool_key
 from utils.config import OPENAI_API_KEY
+from utils.llm_clients import get_chat_model
+from utils.llm_gateway import LLMUnavailable, get_gateway
 
 
 def _get_llm():
-    """Return a ChatOpenAI instance if OPENAI_API_KEY is available, else None."""
+    """Return the shared ChatOpenAI client if OPENAI_API_KEY is available, else None."""
     try:
         if not OPENAI_API_KEY:
             return None
-        return ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
+        return get_chat_model(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
     except Exception:
         return None
 
 
+# Register tools
+TOOLS = {
+    "read_calendar": read_calendar,
+    "lookup_contact": lookup_contact,
+}
+
+# Memoized tool calls shared by ReactAgent.run and tool_executor_node
+TOOL_CACHE = ToolCache(TOOLS)
+
+# Seconds tool_executor_node waits for each tool before recording a timeout
+TOOL_TIMEOUTS = {
+    "read_calendar": 5.0,
+    "lookup_contact": 2.0,
+}
+DEFAULT_TOOL_TIMEOUT = 10.0
+
+# Tools are blocking, so independent calls from one reasoning step run on threads
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+TRACE_LEVELS = ("off", "summary", "full")
+
+
+class TraceStep:
+    """One ReAct step. Observations live once in AgentRun.observations and are referenced by id."""
+
+    __slots__ = ("step", "ts_ns", "thought", "action", "action_input", "tool", "observation_id", "cache_hit")
+
+    def __init__(self, step, ts_ns, thought, action, action_input, tool, observation_id, cache_hit=None):
+        self.step = step
+        self.ts_ns = ts_ns
+        self.thought = thought
+        self.action = action
+        self.action_input = action_input
+        self.tool = tool
+        self.observation_id = observation_id
+        self.cache_hit = cache_hit
+
+
+class AgentRun:
+    """
+    Compact result of ReactAgent.run_compact.
+
+    Step times are monotonic nanoseconds; wall-clock strings are only formatted
+    in to_dict(), from the wall/monotonic anchor taken when the run started.
+    """
+
+    __slots__ = ("trace_id", "level", "wall_start", "mono_start", "subject", "body",
+                 "context", "steps", "observations", "final")
+
+    def __init__(self, trace_id, level, subject, body, context):
+        self.trace_id = trace_id
+        self.level = level
+        self.wall_start = time.time()
+        self.mono_start = time.monotonic_ns()
+        self.subject = subject
+        self.body = body
+        self.context = context
+        self.steps = []
+        self.observations = {}
+        self.final = None
+
+    def format_ts(self, ts_ns):
+        wall = self.wall_start + (ts_ns - self.mono_start) / 1e9
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(wall))
+
+    def to_dict(self) -> Dict[str, Any]:
+        trace = []
+        for s in self.steps:
+            if self.level == "summary":
+                trace.append({
+                    "step": s.step,
+                    "timestamp": self.format_ts(s.ts_ns),
+                    "action": s.action,
+                    "tool": s.tool,
+                    "cache_hit": s.cache_hit,
+                })
+            else:
+                trace.append({
+                    "step": s.step,
+                    "timestamp": self.format_ts(s.ts_ns),
+                    "thought": s.thought,
+                    "action": s.action,
+                    "action_input": s.action_input,
+                    "observation_id": s.observation_id,
+                    "cache_hit": s.cache_hit,
+                })
+        return {
+            "trace_id": self.trace_id,
+            "created_at": self.format_ts(self.mono_start),
+            "trace_level": self.level,
+            "input": {"subject": self.subject, "body": self.body, "context": self.context},
+            "trace": trace,
+            "observations": self.observations,
+            "final": self.final,
+        }
+
+
 class ReactAgent:
-    def __init__(self, max_steps: int = 6):
+    def __init__(self, max_steps: int = 6, trace_level: str = "full", tool_cache: ToolCache = None):
+        """
+        trace_level: "full" keeps every step and observation, "summary" keeps
+        step/action/tool only, "off" keeps just the final summary.
+        tool_cache: defaults to the shared TOOL_CACHE.
+        """
+        if trace_level not in TRACE_LEVELS:
+            raise ValueError(f"trace_level must be one of {TRACE_LEVELS}, got {trace_level!r}")
         self.max_steps = max_steps
+        self.trace_level = trace_level
+        self.tool_cache = tool_cache or TOOL_CACHE
 
     def _new_trace_id(self) -> str:
         return str(uuid.uuid4())
 
-    def _timestamp(self) -> str:
-        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())
-
     def run(self, email_subject: str, email_body: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Run a small ReAct loop for a single email.
 
         Returns:
-            trace dict with keys: trace_id, created_at, input, trace (list of steps), final (summary)
+            trace dict with keys: trace_id, created_at, trace_level, input, trace
+            (list of steps), observations (observation_id -> observation), final (summary)
         """
-        trace_id = self._new_trace_id()
-        created_at = self._timestamp()
-        context = context or {}
+        return self.run_compact(email_subject, email_body, context).to_dict()
 
-        # Initial prompt-like internal state
-        prompt = f"Subject: {email_subject}\nBody: {email_body}"
-
-        trace: List[Dict[str, Any]] = []
+    def run_compact(self, email_subject: str, email_body: str, context: Dict[str, Any] = None) -> AgentRun:
+        """Same loop as run(), returning the compact AgentRun without serializing it."""
+        context = context or {}
+        level = self.trace_level
+        run = AgentRun(self._new_trace_id(), level, email_subject, email_body, context)
+        keep_steps = level != "off"
+        keep_observations = level == "full"
+        last_observation = None
+        # Per-run tool memo, and observation ids by tool cache key so repeated results are
+        # stored once (cache hits hand out fresh copies, so object identity would not do)
+        tool_memo = {}
+        observation_ids = {}
 
         # Very simple rule to decide initial action:
         # if email mentions 'schedule' or 'meeting' -> try calendar; if includes person name -> lookup contact
@@ -84,66 +197,48 @@ class ReactAgent:
                     action_input = {"tool": "read_calendar", "args": {"user_id": "me", "date_hint": None}}
 
             # Execute action
+            tool_name = None
+            cache_hit = None
+            dedup_key = None
             if action == "CALL_TOOL":
                 tool_name = action_input["tool"]
                 args = action_input.get("args", {})
-                if tool_name == "read_calendar":
-                    observation = read_calendar(**args)
-                elif tool_name == "lookup_contact":
-                    observation = lookup_contact(**args)
-                else:
-                    observation = {"tool": tool_name, "error": "Unknown tool"}
+                observation, cache_hit = self.tool_cache.call(tool_name, args, tool_memo)
+                # Within one run the memo answers a repeated key with the same result
+                dedup_key = tool_key(tool_name, args)
 
-                # Optionally update context with observations
-                context["last_observation"] = observation
                 # Also append available_slots to lower_text so next loop can pick FINISH
                 if isinstance(observation, dict) and "available_slots" in observation:
                     lower_text += " calendar_has_slots"
 
             elif action == "FINISH":
                 observation = {"final": action_input}
-                # Add final trace and break
-                trace.append({
-                    "step": step,
-                    "timestamp": self._timestamp(),
-                    "thought": thought,
-                    "action": action,
-                    "action_input": action_input,
-                    "observation": observation,
-                })
-                break
 
-            # Append step trace
-            trace.append({
-                "step": step,
-                "timestamp": self._timestamp(),
-                "thought": thought,
-                "action": action,
-                "action_input": action_input,
-                "observation": observation,
-            })
+            last_observation = observation
+
+            # Record the step; the observation is stored once and referenced by id
+            if keep_steps:
+                observation_id = None
+                if keep_observations:
+                    observation_id = observation_ids.get(dedup_key) if dedup_key is not None else None
+                    if observation_id is None:
+                        observation_id = f"obs-{step}"
+                        if dedup_key is not None:
+                            observation_ids[dedup_key] = observation_id
+                        run.observations[observation_id] = observation
+                run.steps.append(TraceStep(step, time.monotonic_ns(), thought, action, action_input, tool_name, observation_id, cache_hit))
+
+            if action == "FINISH":
+                break
 
         # Summarize final decision
-        final_summary = {
+        run.final = {
             "summary": "Agent suggests follow-up action based on tools and reasoning.",
-            "suggested_action": trace[-1]["observation"] if trace else {},
+            "suggested_action": last_observation if last_observation is not None else {},
         }
 
-        return {
-            "trace_id": trace_id,
-            "created_at": created_at,
-            "input": {"subject": email_subject, "body": email_body, "context": context},
-            "trace": trace,
-            "final": final_summary,
-        }
+        return run
     
-
-# Register tools
-TOOLS = {
-    "read_calendar": read_calendar,
-    "lookup_contact": lookup_contact,
-}
-
 def reason_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     ReAct reasoning step:
@@ -169,22 +264,40 @@ Response format JSON:
 {{
   "thought": "...",
   "action": "read_calendar" | "lookup_contact" | "reply",
-  "action_input": "string"
+  "action_input": "string",
+  "tool_calls": [{{"tool": "read_calendar" | "lookup_contact", "args": {{...}}}}]
 }}
+"tool_calls" is optional: list several independent tool calls there to run them together
+(e.g. a contact lookup and a calendar read for a scheduling email).
 """
 
     llm = _get_llm()
-    if llm is None:
+    result = None
+    if llm is not None:
+        try:
+            result = get_gateway().invoke(llm, prompt)
+        except LLMUnavailable:
+            # Provider degraded: decide with the keyword fallback below
+            result = None
+
+    if result is None:
         # Fallback simple decision without LLM
         text = str(email).lower()
         if any(k in text for k in ["schedule", "meeting", "call"]):
-            state["reasoning_output"] = {"thought": "Check calendar for availability.", "action": "read_calendar", "action_input": {"user_id": "me", "date_hint": "next available"}}
+            calendar_args = {"user_id": "me", "date_hint": "next available"}
+            state["reasoning_output"] = {"thought": "Check calendar for availability.", "action": "read_calendar", "action_input": calendar_args}
+            if state.get("sender"):
+                # Who is asking and when I am free are independent; fetch both in one step
+                state["reasoning_output"]["thought"] = "Look up the sender and check calendar for availability."
+                state["reasoning_output"]["tool_calls"] = [
+                    {"tool": "lookup_contact", "args": {"query": state["sender"]}},
+                    {"tool": "read_calendar", "args": calendar_args},
+                ]
         elif any(k in text for k in ["who is", "contact", "email"]):
             state["reasoning_output"] = {"thought": "Lookup contact details.", "action": "lookup_contact", "action_input": {"query": state.get("sender") or "alice"}}
         else:
             state["reasoning_output"] = {"thought": "Reply directly with helpful guidance.", "action": "reply", "action_input": "Let me know preferred times."}
     else:
-        result = llm.invoke(prompt)
         # Try to parse model output into dict
         parsed = None
         try:
@@ -197,31 +310,88 @@ Response format JSON:
     return state
 
 
-def tool_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    #Executes tools selected by the ReAct agent.
-   
-    decision = state.get("reasoning_output", {})
-
-    action = decision.get("action")
-    action_input = decision.get("action_input")
-
-    if action == "read_calendar":
+def _tool_args(tool_name: str, action_input: Any, state: Dict[str, Any]) -> Dict[str, Any]:
+    # Accept dict args, a bare string, or nothing, as the reasoning step may produce any of them
+    if tool_name == "read_calendar":
         if isinstance(action_input, dict):
-            state["tool_result"] = read_calendar(**action_input)
-        elif isinstance(action_input, str):
-            state["tool_result"] = read_calendar(user_id="me", date_hint=action_input)
-        else:
-            state["tool_result"] = read_calendar(user_id="me", date_hint=None)
-    elif action == "lookup_contact":
+            return action_input
+        if isinstance(action_input, str):
+            return {"user_id": "me", "date_hint": action_input}
+        return {"user_id": "me", "date_hint": None}
+    if tool_name == "lookup_contact":
         if isinstance(action_input, dict):
             q = action_input.get("query")
         elif isinstance(action_input, str):
             q = action_input
         else:
             q = state.get("sender") or "alice"
-        state["tool_result"] = lookup_contact(query=q)
-    else:
+        return {"query": q}
+    return action_input if isinstance(action_input, dict) else {}
+
+
+def _tool_calls(decision: Dict[str, Any], state: Dict[str, Any]) -> List[tuple]:
+    """(tool_name, args) pairs requested by a reasoning step, duplicates dropped."""
+    requested = decision.get("tool_calls")
+    if not isinstance(requested, list) or not requested:
+        requested = [{"tool": decision.get("action"), "args": decision.get("action_input")}]
+    calls = []
+    for call in requested:
+        if not isinstance(call, dict) or call.get("tool") not in TOOLS:
+            continue
+        entry = (call["tool"], _tool_args(call["tool"], call.get("args"), state))
+        if entry not in calls:
+            calls.append(entry)
+    return calls
+
+
+def run_tool_calls(calls: List[tuple], cache: ToolCache = None, run_memo: dict = None) -> List[tuple]:
+    """
+    Run (tool_name, args) calls concurrently through the tool cache.
+
+    Returns (result, cache_hit) per call, in call order. A tool that raises or
+    exceeds its TOOL_TIMEOUTS entry yields an {"tool", "error"} observation
+    instead; a timed-out call keeps running on its thread but is not waited for.
+    """
+    cache = cache or TOOL_CACHE
+    started = time.monotonic()
+    futures = [_TOOL_POOL.submit(cache.call, name, args, run_memo) for name, args in calls]
+
+    outcomes = []
+    for (name, args), future in zip(calls, futures):
+        timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            # All calls started together, so each waits only for what is left of its own budget
+            outcomes.append(future.result(timeout=max(0.0, started + timeout - time.monotonic())))
+        except FuturesTimeout:
+            outcomes.append(({"tool": name, "error": f"Timed out after {timeout}s"}, None))
+        except Exception as e:
+            outcomes.append(({"tool": name, "error": str(e)}, None))
+    return outcomes
+
+
+def tool_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executes the tools selected by the ReAct reasoning step.
+
+    A single tool call leaves its observation in state["tool_result"]. When the
+    decision lists several independent "tool_calls", they run concurrently and
+    state["tool_result"] holds {"tool": "multi", "results": [...]} in call order.
+    state["tool_cache_hit"] follows the same single/list shape.
+    """
+    decision = state.get("reasoning_output", {})
+
+    calls = _tool_calls(decision, state)
+    if not calls:
         state["tool_result"] = None  # direct reply mode
+        state["tool_cache_hit"] = None
+        return state
+
+    outcomes = run_tool_calls(calls)
+    if len(outcomes) == 1:
+        state["tool_result"], state["tool_cache_hit"] = outcomes[0]
+    else:
+        state["tool_result"] = {"tool": "multi", "results": [result for result, _ in outcomes]}
+        state["tool_cache_hit"] = [hit for _, hit in outcomes]
 
     return state
 
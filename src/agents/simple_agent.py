@@ -1,13 +1,19 @@
-from langchain_openai import ChatOpenAI
-from utils.config import OPENAI_API_KEY, require_env
+from typing import TYPE_CHECKING
+from utils import config
+from utils.config import require_env
+from utils.llm_clients import get_chat_model
+from utils.llm_gateway import get_gateway
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
-def _get_llm() -> ChatOpenAI:
-    require_env("OPENAI_API_KEY", OPENAI_API_KEY)
-    return ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY)
+
+def _get_llm() -> "ChatOpenAI":
+    require_env("OPENAI_API_KEY", config.OPENAI_API_KEY)
+    return get_chat_model(model="gpt-4o-mini", api_key=config.OPENAI_API_KEY)
 
 
 def simple_agent() -> str:
     llm = _get_llm()
-    msg = llm.invoke("Hello! Respond with: Hello Agent works!")
+    msg = get_gateway().invoke(llm, "Hello! Respond with: Hello Agent works!")
     return getattr(msg, "content", str(msg))
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Emails/sec on rules-only traffic: per-email graph.invoke vs the batch workflow.
+
+Run from src/:  python -m benchmarks.bench_batch --emails 2000
+"""
+import argparse
+import time
+
+from workflow.triage_workflow import create_triage_workflow, create_triage_batch_workflow
+
+
+def make_states(n):
+    # noreply senders classify as "automated" with confidence 1.0, so rules always win
+    return [
+        {"subject": f"Build #{i} finished", "body": "Pipeline status report.", "sender": "noreply@ci.example.com"}
+        for i in range(n)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batch triage")
+    parser.add_argument("--emails", type=int, default=2000)
+    args = parser.parse_args()
+
+    states = make_states(args.emails)
+
+    graph = create_triage_workflow()
+    start = time.perf_counter()
+    single = [graph.invoke(s) for s in states]
+    before = len(states) / (time.perf_counter() - start)
+
+    batch_graph = create_triage_batch_workflow()
+    start = time.perf_counter()
+    batched = batch_graph.invoke({"emails": states})["results"]
+    after = len(states) / (time.perf_counter() - start)
+
+    assert [(r["label"], r["source"]) for r in batched] == [(r["label"], r["source"]) for r in single]
+
+    print(f"emails={len(states)}")
+    print(f"graph.invoke per email: {before:,.0f} emails/sec")
+    print(f"batch workflow:         {after:,.0f} emails/sec  ({after / before:.1f}x)")
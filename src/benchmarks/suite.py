@@ -0,0 +1,202 @@
+"""Throughput, latency and memory benchmarks for the triage and agent paths.
+
+Run from src/:  python -m benchmarks.suite --emails 2000 --body-kb 4 --out ../bench.json
+
+Targets:
+  rules       TriageRules.classify
+  node        TriageNode.run with a stub LLM (no network)
+  graph       compiled create_triage_workflow() graph, same stub LLM
+  react       ReactAgent.run
+  pipeline    create_email_pipeline() with a SQLite checkpointer (adds per-node checkpoint cost)
+Each reports emails/sec, p50/p95/p99 latency (ms) and peak traced memory (KB) as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+# The stub replaces every LLM call; these only keep client/cache construction offline
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-no-calls")
+os.environ.setdefault("TRIAGE_LLM_CACHE_PATH", ":memory:")
+
+from benchmarks.synthetic import generate_emails
+
+
+class StubLLM:
+    """Stands in for LLMFallbackTriage: fixed answer, optional simulated latency."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+
+    def classify(self, subject, body):
+        if self.latency:
+            time.sleep(self.latency)
+        return {"label": "personal", "confidence": 0.9, "source": "llm"}
+
+    def classify_many(self, emails):
+        return [self.classify(subject, body) for subject, body in emails]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(call, emails, memory_sample=200):
+    """Time call(email) per email, then re-run a sample under tracemalloc for peak memory."""
+    latencies = []
+    start = time.perf_counter()
+    for email in emails:
+        t0 = time.perf_counter_ns()
+        call(email)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc slows allocation-heavy code, so it is kept out of the timed pass
+    tracemalloc.start()
+    for email in emails[:memory_sample]:
+        call(email)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "emails": len(emails),
+        "emails_per_sec": round(len(emails) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) / 1e6, 4),
+            "p95": round(_percentile(latencies, 95) / 1e6, 4),
+            "p99": round(_percentile(latencies, 99) / 1e6, 4),
+        },
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_rules(emails, args):
+    from triage.triage_rules import TriageRules
+    rules = TriageRules()
+    return measure(lambda e: rules.classify(e["subject"], e["body"], e["sender"]), emails)
+
+
+def bench_node(emails, args):
+    from triage.triage_node import TriageNode
+    node = TriageNode(threshold=args.threshold)
+    node.llm = StubLLM(args.llm_latency_ms)
+    return measure(node.run, emails)
+
+
+def bench_graph(emails, args):
+    from workflow import triage_workflow
+    graph = triage_workflow.create_triage_workflow()
+    node = triage_workflow._get_triage()
+    node.threshold = args.threshold
+    node.llm = StubLLM(args.llm_latency_ms)
+    return measure(
+        lambda e: graph.invoke({"subject": e["subject"], "body": e["body"], "sender": e["sender"]}),
+        emails
+    )
+
+
+def bench_react(emails, args):
+    from agents.react_loop import ReactAgent
+    agent = ReactAgent(max_steps=6)
+    return measure(lambda e: agent.run(e["subject"], e["body"], context={"sender": e["sender"]}), emails)
+
+
+def bench_pipeline(emails, args):
+    from agents import react_loop
+    from utils.metrics import METRICS
+    from workflow import email_pipeline, triage_workflow
+    from workflow.checkpoint import SqliteCheckpointSaver
+
+    # Rule-based reasoning only; the stub covers triage
+    react_loop.OPENAI_API_KEY = ""
+    node = triage_workflow._get_triage()
+    node.threshold = args.threshold
+    node.llm = StubLLM(args.llm_latency_ms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = SqliteCheckpointSaver(os.path.join(tmp, "checkpoints.db"), batch_size=args.checkpoint_batch)
+        graph = email_pipeline.create_email_pipeline(checkpointer=saver)
+        METRICS.reset()
+        counter = iter(range(10 ** 9))
+        result = measure(
+            lambda e: graph.invoke(
+                {"subject": e["subject"], "body": e["body"], "sender": e["sender"]},
+                {"configurable": {"thread_id": f"bench:{next(counter)}"}},
+            ),
+            emails,
+        )
+        saver.close()
+
+    histograms = METRICS.snapshot()["histograms"]
+    puts = histograms.get("checkpoint_put_seconds", {})
+    flushes = histograms.get("checkpoint_flush_seconds", {}).get("", {"count": 0, "sum": 0.0})
+    result["checkpoint"] = {
+        "batch_size": args.checkpoint_batch,
+        "put_us": {labels: round(h["sum"] / h["count"] * 1e6, 1) for labels, h in puts.items() if h["count"]},
+        "puts_per_email": round(sum(h["count"] for h in puts.values()) / (len(emails) + min(len(emails), 200)), 2),
+        "flushes": flushes["count"],
+        "flush_ms": round(flushes["sum"] / flushes["count"] * 1e3, 3) if flushes["count"] else 0.0,
+    }
+    return result
+
+
+TARGETS = {
+    "rules": bench_rules,
+    "node": bench_node,
+    "graph": bench_graph,
+    "react": bench_react,
+    "pipeline": bench_pipeline,
+}
+
+
+def run_suite(targets, args):
+    emails = list(generate_emails(args.emails, body_kb=args.body_kb, seed=args.seed))
+    report = {
+        "config": {
+            "emails": args.emails,
+            "body_kb": args.body_kb,
+            "seed": args.seed,
+            "threshold": args.threshold,
+            "llm_latency_ms": args.llm_latency_ms,
+            "checkpoint_batch": args.checkpoint_batch,
+            "python": platform.python_version(),
+        },
+        "results": {},
+    }
+    for name in targets:
+        report["results"][name] = TARGETS[name](emails, args)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the triage benchmark suite")
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--body-kb", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threshold", type=float, default=0.80, help="TriageNode rules confidence threshold")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency of the stub LLM")
+    parser.add_argument("--checkpoint-batch", type=int, default=64, help="Checkpoint rows per SQLite commit (pipeline target)")
+    parser.add_argument("--targets", type=str, default=",".join(TARGETS), help="Comma-separated subset of: " + ", ".join(TARGETS))
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    report = run_suite(targets, args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Benchmark report saved to: {args.out}")
+    else:
+        print(text)
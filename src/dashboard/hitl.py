@@ -1,39 +1,112 @@
 import streamlit as st
 import json
+import os
+import sys
 from datetime import datetime
 
+# Run as `streamlit run src/dashboard/hitl.py`; make src/ importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from dashboard.review_queue import DEFAULT_QUEUE_PATH, ReviewQueue
+
 st.set_page_config(page_title="HITL Review", layout="wide")
 
+PAGE_SIZE = 50
+
+
+@st.cache_resource
+def get_queue(path):
+    # One connection per server process, shared by every session
+    return ReviewQueue(path)
+
+
+# Query results are cached per filter/page, so widget reruns do not hit SQLite;
+# a decision clears them
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_page(path, label, sender, max_age_hours, cursor):
+    return get_queue(path).page(label=label, sender=sender, max_age_hours=max_age_hours, cursor=cursor, limit=PAGE_SIZE)
 
-def load_pending_email():
-    # Normally you will pass email data from triage or agent
-    return {
-        "email": {
-            "subject": "Team meeting request",
-            "body": "Can we meet tomorrow for the project update?",
-            "sender": "manager@company.com"
-        },
-        "triage": {
-            "label": "meeting_request",
-            "confidence": 0.91,
-            "source": "rules"
-        },
-        "react_trace": [
-            {"step": 1, "thought": "User wants to schedule a meeting."},
-            {"step": 2, "action": "read_calendar"},
-            {"step": 3, "observation": "Available tomorrow at 10am, 11am"},
-        ],
-        "final_action": "Ask user for preferred time"
-    }
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_counts(path):
+    return get_queue(path).counts()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_item(path, item_id):
+    return get_queue(path).get(item_id)
+
+
+def record_decision(path, item_id, decision, message):
+    if get_queue(path).decide(item_id, decision, reviewer=os.getenv("USER")):
+        st.session_state["flash"] = ("success" if decision == "approved" else "warning", message)
+    else:
+        st.session_state["flash"] = ("warning", "This item was already decided.")
+    load_page.clear()
+    load_counts.clear()
+    load_item.clear()
+    st.rerun()
 
 
 # HITL UI Section
 
-data = load_pending_email()
+queue_path = os.getenv("REVIEW_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+counts = load_counts(queue_path)
 
 st.title("Human-in-the-Loop Review")
 st.write("Review the agent’s reasoning and approve or escalate.")
 
+# Result of the decision made before the last rerun
+if "flash" in st.session_state:
+    kind, message = st.session_state.pop("flash")
+    getattr(st, kind)(message)
+
+# Filters
+with st.sidebar:
+    st.header("Pending")
+    st.metric("Items", sum(counts.values()))
+    label = st.selectbox("Label", ["All"] + list(counts), format_func=lambda l: l if l == "All" else f"{l} ({counts[l]})")
+    sender = st.text_input("Sender (exact address)").strip()
+    max_age = st.selectbox("Received", [None, 1, 24, 24 * 7], format_func=lambda h: {
+        None: "Any time", 1: "Last hour", 24: "Last day", 24 * 7: "Last week"}[h])
+
+filters = (None if label == "All" else label, sender or None, max_age)
+if st.session_state.get("filters") != filters:
+    # New filters start from the first page
+    st.session_state["filters"] = filters
+    st.session_state["cursors"] = [None]
+cursors = st.session_state["cursors"]
+
+rows, next_cursor = load_page(queue_path, *filters, cursors[-1])
+
+if not rows:
+    st.info("No pending items for these filters.")
+    st.stop()
+
+nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+with nav_prev:
+    if len(cursors) > 1 and st.button("← Newer"):
+        cursors.pop()
+        st.rerun()
+with nav_info:
+    st.caption(f"Page {len(cursors)} · {len(rows)} items")
+with nav_next:
+    if next_cursor and st.button("Older →"):
+        cursors.append(next_cursor)
+        st.rerun()
+
+selected = st.radio(
+    "Pending items",
+    [row["id"] for row in rows],
+    format_func=lambda i: next(
+        f"#{r['id']} · {r['label']} · {r['sender']} · {datetime.fromtimestamp(r['created_at']):%Y-%m-%d %H:%M}"
+        for r in rows if r["id"] == i
+    ),
+)
+
+data = load_item(queue_path, selected)
+
 # Show original email
 st.header("Original Email")
 st.json(data["email"])
@@ -48,7 +121,7 @@ st.json(data["react_trace"])
 
 # Final agent action
 st.header("Proposed Action")
-st.success(data["final_action"])
+st.success(data["final_action"] if isinstance(data["final_action"], str) else json.dumps(data["final_action"]))
 
 st.divider()
 
@@ -59,20 +132,8 @@ col1, col2 = st.columns(2)
 
 with col1:
     if st.button("✅ Approve Action"):
-        st.success("Action Approved!")
-        with open("approved_actions.json", "a") as f:
-            f.write(json.dumps({
-                "timestamp": str(datetime.now()),
-                "decision": "approved",
-                "data": data
-            }) + "\n")
+        record_decision(queue_path, selected, "approved", "Action Approved!")
 
 with col2:
     if st.button("⚠️ Escalate to Human"):
-        st.warning("Escalated for human review.")
-        with open("escalated_actions.json", "a") as f:
-            f.write(json.dumps({
-                "timestamp": str(datetime.now()),
-                "decision": "escalated",
-                "data": data
-            }) + "\n")
+        record_decision(queue_path, selected, "escalated", "Escalated for human review.")
@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import sqlite_utils
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "review_queue.db"
+)
+
+STATUSES = ("pending", "approved", "escalated")
+
+# How counts() reports items queued without a triage label; page() accepts it as a filter
+UNLABELED = "unknown"
+
+
+class ReviewQueue:
+    """
+    Persistent HITL review queue.
+
+    The agent pipeline enqueues items (idempotently, keyed by item_key), the
+    dashboard pages through them newest first with keyset pagination on
+    indexed columns (status + created_at, optionally label or sender), and each
+    decision updates the item and appends to the decision log in one
+    transaction. An item can only be decided once.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        if path != ":memory:":
+            out_dir = os.path.dirname(path)
+            if out_dir and not os.path.exists(out_dir):
+                os.makedirs(out_dir, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self.db = sqlite_utils.Database(conn)
+        # One connection shared by dashboard sessions; serialize access to it
+        self._lock = threading.Lock()
+
+        items = self.db["review_items"]
+        if not items.exists():
+            items.create({
+                "id": int, "item_key": str, "status": str, "label": str, "sender": str,
+                "confidence": float, "created_at": float, "decided_at": float, "payload": str,
+            }, pk="id", not_null={"item_key", "status", "created_at"})
+            items.create_index(["item_key"], unique=True)
+            items.create_index(["status", "created_at", "id"])
+            items.create_index(["status", "label", "created_at", "id"])
+            items.create_index(["status", "sender", "created_at", "id"])
+
+        decisions = self.db["decisions"]
+        if not decisions.exists():
+            decisions.create({
+                "id": int, "item_id": int, "decision": str, "reviewer": str, "note": str, "decided_at": float,
+            }, pk="id", foreign_keys=[("item_id", "review_items", "id")])
+            decisions.create_index(["item_id"])
+            decisions.create_index(["decided_at", "id"])
+
+    # --- writes --------------------------------------------------------------
+
+    def enqueue(self, item_key, email, triage=None, react_trace=None, final_action=None, created_at=None):
+        """Add one pending item; returns its id, or None if item_key was already queued."""
+        ids = self.enqueue_many([{
+            "item_key": item_key, "email": email, "triage": triage,
+            "react_trace": react_trace, "final_action": final_action, "created_at": created_at,
+        }])
+        return ids[0] if ids else None
+
+    def enqueue_many(self, items):
+        """Add pending items in one transaction, skipping item_keys already queued; returns the new ids."""
+        now = time.time()
+        rows = []
+        for item in items:
+            email = item.get("email") or {}
+            triage = item.get("triage") or {}
+            rows.append((
+                str(item["item_key"]), triage.get("label"), email.get("sender"), triage.get("confidence"),
+                item.get("created_at") or now,
+                json.dumps({
+                    "email": email, "triage": triage,
+                    "react_trace": item.get("react_trace") or [], "final_action": item.get("final_action"),
+                }, ensure_ascii=False, default=str),
+            ))
+        new_ids = []
+        with self._lock, self.db.conn:
+            for row in rows:
+                cursor = self.db.conn.execute(
+                    "INSERT OR IGNORE INTO review_items (item_key, status, label, sender, confidence, created_at, payload)"
+                    " VALUES (?, 'pending', ?, ?, ?, ?, ?)", row
+                )
+                if cursor.rowcount:
+                    new_ids.append(cursor.lastrowid)
+        return new_ids
+
+    def decide(self, item_id, decision, reviewer=None, note=None):
+        """Record a decision ("approved" or "escalated"); False if the item is missing or already decided."""
+        if decision not in STATUSES[1:]:
+            raise ValueError(f"Unknown decision '{decision}'. Use one of: {', '.join(STATUSES[1:])}")
+        now = time.time()
+        with self._lock, self.db.conn:
+            updated = self.db.conn.execute(
+                "UPDATE review_items SET status = ?, decided_at = ? WHERE id = ? AND status = 'pending'",
+                (decision, now, item_id),
+            ).rowcount
+            if not updated:
+                return False
+            self.db.conn.execute(
+                "INSERT INTO decisions (item_id, decision, reviewer, note, decided_at) VALUES (?, ?, ?, ?, ?)",
+                (item_id, decision, reviewer, note, now),
+            )
+        return True
+
+    # --- reads ---------------------------------------------------------------
+
+    def page(self, status="pending", label=None, sender=None, max_age_hours=None, cursor=None, limit=50):
+        """
+        One page of items, newest first, without payloads.
+
+        cursor: the "cursor" of the previous page's last row, (created_at, id);
+        pages stay fast however deep they go because no OFFSET is used.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        where, params = ["status = ?"], [status]
+        if label == UNLABELED:
+            where.append("label IS NULL")
+        elif label:
+            where.append("label = ?")
+            params.append(label)
+        if sender:
+            where.append("sender = ?")
+            params.append(sender)
+        if max_age_hours:
+            where.append("created_at >= ?")
+            params.append(time.time() - max_age_hours * 3600)
+        if cursor:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        query = (
+            "SELECT id, item_key, status, label, sender, confidence, created_at, decided_at FROM review_items"
+            f" WHERE {' AND '.join(where)} ORDER BY created_at DESC, id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = [dict(zip(
+                ("id", "item_key", "status", "label", "sender", "confidence", "created_at", "decided_at"), row
+            )) for row in self.db.conn.execute(query, params + [limit + 1])]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    def get(self, item_id):
+        """Full item, including the email, triage result, trace and proposed action."""
+        with self._lock:
+            row = self.db.conn.execute(
+                "SELECT id, item_key, status, label, sender, confidence, created_at, decided_at, payload"
+                " FROM review_items WHERE id = ?", (item_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        item = dict(zip(("id", "item_key", "status", "label", "sender", "confidence", "created_at", "decided_at"), row))
+        item.update(json.loads(row[-1]))
+        return item
+
+    def counts(self, status="pending"):
+        """{label: count} for one status; unlabeled items are counted under UNLABELED."""
+        with self._lock:
+            rows = self.db.conn.execute(
+                "SELECT label, COUNT(*) FROM review_items WHERE status = ? GROUP BY label ORDER BY COUNT(*) DESC",
+                (status,),
+            ).fetchall()
+        return {label or UNLABELED: count for label, count in rows}
+
+    def decisions(self, cursor=None, limit=50):
+        """Decision log page, newest first; same cursor contract as page()."""
+        where, params = "", []
+        if cursor:
+            where, params = "WHERE (d.decided_at, d.id) < (?, ?)", list(cursor)
+        with self._lock:
+            rows = self.db.conn.execute(
+                "SELECT d.id, d.item_id, d.decision, d.reviewer, d.note, d.decided_at, i.label, i.sender"
+                f" FROM decisions d JOIN review_items i ON i.id = d.item_id {where}"
+                " ORDER BY d.decided_at DESC, d.id DESC LIMIT ?", params + [limit + 1]
+            ).fetchall()
+        rows = [dict(zip(("id", "item_id", "decision", "reviewer", "note", "decided_at", "label", "sender"), r))
+                for r in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["decided_at"], rows[-1]["id"])
+        return rows, next_cursor
+
+    def close(self):
+        self.db.conn.close()
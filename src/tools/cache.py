@@ -0,0 +1,103 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Seconds a shared result stays valid, per tool. Calendars change during the day,
+# the contact directory rarely does.
+DEFAULT_TTLS = {
+    "read_calendar": 60,
+    "lookup_contact": 3600,
+}
+
+
+# Free-text arguments, matched without regard to case or spacing. Anything else
+# (user ids, paths) is case-sensitive and keyed as given.
+FREE_TEXT_ARGS = {"query", "date_hint"}
+
+
+def _normalize(args):
+    return {
+        k: " ".join(v.split()).lower() if k in FREE_TEXT_ARGS and isinstance(v, str) else v
+        for k, v in args.items() if v is not None
+    }
+
+
+def tool_key(tool_name: str, args: Dict[str, Any]) -> str:
+    """Cache key: tool name plus arguments, free-text ones case/whitespace folded, None args dropped."""
+    return tool_name + ":" + json.dumps(_normalize(args or {}), sort_keys=True, default=str)
+
+
+class ToolCache:
+    """
+    Memoizes tool calls from the TOOLS registry.
+
+    Two scopes:
+    - per run: a dict passed in by the caller (ReactAgent.run keeps one per
+      email), so repeated calls inside one run always reuse the first result;
+    - shared: a process-wide LRU of `max_entries` results, each valid for the
+      tool's TTL, so identical lookups across emails are served from memory.
+    Tools without a TTL entry use `default_ttl`; a TTL of 0 disables sharing.
+    Both scopes keep their own copy of a result and hand out deep copies, so
+    a caller mutating a returned dict cannot change what later hits see.
+    """
+
+    def __init__(self, tools: Dict[str, Callable], ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 60, max_entries: int = 1024):
+        self.tools = tools
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._shared = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"run_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def call(self, tool_name: str, args: Dict[str, Any], run_memo: Optional[dict] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Call `tool_name(**args)` through the cache.
+
+        Returns (result, hit) where hit is "run", "shared" or None for a real call.
+        Unknown tools return the usual error observation and are never cached.
+        """
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            return {"tool": tool_name, "error": "Unknown tool"}, None
+
+        key = tool_key(tool_name, args)
+        if run_memo is not None and key in run_memo:
+            with self._lock:
+                self.stats["run_hits"] += 1
+            return copy.deepcopy(run_memo[key]), "run"
+
+        ttl = self.ttls.get(tool_name, self.default_ttl)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._shared.get(key)
+            if entry is not None and entry[0] > now:
+                self._shared.move_to_end(key)
+                self.stats["shared_hits"] += 1
+                result = entry[1]
+                if run_memo is not None:
+                    run_memo[key] = result
+                return copy.deepcopy(result), "shared"
+            self.stats["misses"] += 1
+
+        result = tool(**(args or {}))
+
+        # Cached values are never handed out themselves, only copies of them
+        stored = copy.deepcopy(result)
+        if run_memo is not None:
+            run_memo[key] = stored
+        if ttl > 0:
+            with self._lock:
+                self._shared[key] = (now + ttl, stored)
+                self._shared.move_to_end(key)
+                while len(self._shared) > self.max_entries:
+                    self._shared.popitem(last=False)
+        return result, None
+
+    def clear(self):
+        with self._lock:
+            self._shared.clear()
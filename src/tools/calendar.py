@@ -1,21 +1,73 @@
+
 import datetime
+import os
 from typing import Dict, Any, List
 
+from tools.calendar_index import CalendarIndex, Event, parse_date_hint
+
+MAX_SLOTS = 4
+MAX_EVENTS = 10
+
+_index = None
+_index_source = None
+
+
+def _mock_events(now: datetime.datetime) -> Dict[str, List[Event]]:
+    # Two weeks of weekday standups and syncs for "me", used without CALENDAR_PATH
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(-1, 15):
+        day = today + datetime.timedelta(days=i)
+        if day.weekday() < 5:
+            events.append(Event("Daily Standup", day.replace(hour=10), day.replace(hour=10, minute=15)))
+            events.append(Event("Project Sync", day.replace(hour=15), day.replace(hour=16)))
+    return {"me": events}
+
+
+def _source_signature(path):
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    return tuple((p, st.st_size, st.st_mtime_ns) for p in paths for st in [os.stat(p)])
+
+
+def get_calendar() -> CalendarIndex:
+    """
+    The calendar index used by read_calendar.
+
+    CALENDAR_PATH may point to an .ics/.json file or a directory of them (see
+    calendar_index.load_events); the index is rebuilt when those files change.
+    Without it a mock calendar for "me" is used, rebuilt when the date changes
+    so that its events stay around today in a long-running process.
+    """
+    global _index, _index_source
+    path = os.getenv("CALENDAR_PATH")
+    now = datetime.datetime.now()
+    source = _source_signature(path) if path else ("mock", now.date())
+    if _index is None or source != _index_source:
+        _index = CalendarIndex.load(path) if path else CalendarIndex(_mock_events(now))
+        _index_source = source
+    return _index
+
 
 def read_calendar(user_id: str = "me", date_hint: str = None) -> Dict[str, Any]:
+    """
+    Free slots and events for a user within the window described by date_hint.
+
+    Args:
+        user_id: calendar owner
+        date_hint: free text such as "tomorrow afternoon", "next monday" or
+            "2025-03-14"; missing or unrecognised hints mean the next two weeks
 
+    Returns:
+        dict with the next free 30-minute slots and the events in the window
+    """
     now = datetime.datetime.now()
-    # available slots list
-    base_hour = 9
-    available_slots: List[str] = []
-    for i in range(4):
-        slot_time = (now + datetime.timedelta(days=i)).replace(hour=base_hour + i, minute=0, second=0, microsecond=0)
-        available_slots.append(slot_time.isoformat())
-
-    events = [
-        {"title": "Daily Standup", "time": (now.replace(hour=10, minute=0)).isoformat()},
-        {"title": "Project Sync", "time": (now.replace(hour=15, minute=0)).isoformat()},
-    ]
+    start, end, window = parse_date_hint(date_hint, now)
+    calendar = get_calendar().user(user_id or "me")
+
+    available_slots = [slot.isoformat() for slot in calendar.next_free_slots(start, end, count=MAX_SLOTS)]
+    events = [e.to_dict() for e in calendar.events_between(start, end, limit=MAX_EVENTS)]
 
     # If a date_hint is included, include it in returned context
     hint_text = f"Date hint received: {date_hint}" if date_hint else "No date hint"
@@ -25,7 +77,7 @@ def read_calendar(user_id: str = "me", date_hint: str = None) -> Dict[str, Any]:
         "user_id": user_id,
         "available_slots": available_slots,
         "events": events,
-        "note": hint_text,
+        "note": f"{hint_text}; window: {window}",
     }
 
 
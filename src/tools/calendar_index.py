@@ -0,0 +1,345 @@
+"""Interval index and free/busy queries behind read_calendar.
+
+Events are loaded from local .ics or .json files (see load_events) into one
+sorted-array index per user:
+
+    events      sorted by start, with a running maximum of end times so the
+                events overlapping a window are found with two bisects
+    busy        the same events merged into disjoint, sorted intervals, so
+                free/busy and next-free-slot queries only walk the gaps
+
+All times are naive local datetimes, like the rest of the tools.
+"""
+import bisect
+import datetime
+import json
+import os
+import re
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_EVENT_MINUTES = 30
+# Recurring ICS events are expanded this far past the load time
+RECURRENCE_HORIZON_DAYS = 366
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_ICS_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+class Event:
+    __slots__ = ("title", "start", "end")
+
+    def __init__(self, title, start, end):
+        self.title = title
+        self.start = start
+        self.end = end
+
+    def to_dict(self):
+        return {"title": self.title, "time": self.start.isoformat(), "end": self.end.isoformat()}
+
+
+def _parse_iso(value):
+    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _local(dt):
+    # Aware times are converted to local time and made naive
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _json_event(item):
+    start = _local(_parse_iso(item.get("start") or item["time"]))
+    if item.get("end"):
+        end = _local(_parse_iso(item["end"]))
+    else:
+        end = start + datetime.timedelta(minutes=int(item.get("duration_minutes", DEFAULT_EVENT_MINUTES)))
+    return Event(item.get("title") or item.get("summary") or "Busy", start, end)
+
+
+def _load_json(path, default_user):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    events = {}
+    if isinstance(data, dict):
+        # {"user_id": [event, ...], ...}
+        for user_id, items in data.items():
+            events.setdefault(user_id, []).extend(_json_event(item) for item in items)
+    else:
+        # [event, ...], each optionally tagged with its own user_id
+        for item in data:
+            events.setdefault(item.get("user_id", default_user), []).append(_json_event(item))
+    return events
+
+
+def _ics_time(value, params):
+    if "VALUE=DATE" in params or len(value) == 8:
+        return datetime.datetime.strptime(value[:8], "%Y%m%d")
+    dt = datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return _local(dt)
+
+
+def _ics_duration(value):
+    match = re.fullmatch(r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", value)
+    if not match:
+        return None
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return datetime.timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def _expand_rrule(event, rule, until_limit):
+    """Yield occurrences of a DAILY/WEEKLY rule (INTERVAL, COUNT, UNTIL, BYDAY)."""
+    parts = dict(p.split("=", 1) for p in rule.split(";") if "=" in p)
+    freq = parts.get("FREQ")
+    if freq not in ("DAILY", "WEEKLY"):
+        yield event
+        return
+    interval = int(parts.get("INTERVAL", 1))
+    count = int(parts["COUNT"]) if "COUNT" in parts else None
+    until = _ics_time(parts["UNTIL"], "") if "UNTIL" in parts else until_limit
+    until = min(until, until_limit)
+    byday = [_ICS_DAYS.index(d[-2:]) for d in parts.get("BYDAY", "").split(",") if d[-2:] in _ICS_DAYS]
+    duration = event.end - event.start
+
+    emitted = 0
+    if freq == "DAILY":
+        step = datetime.timedelta(days=interval)
+        start = event.start
+        while start <= until and (count is None or emitted < count):
+            if not byday or start.weekday() in byday:
+                yield Event(event.title, start, start + duration)
+                emitted += 1
+            start += step
+        return
+
+    days = sorted(byday) or [event.start.weekday()]
+    week_start = event.start - datetime.timedelta(days=event.start.weekday())
+    while week_start <= until and (count is None or emitted < count):
+        for day in days:
+            start = week_start + datetime.timedelta(days=day)
+            if start < event.start or start > until or (count is not None and emitted >= count):
+                continue
+            yield Event(event.title, start, start + duration)
+            emitted += 1
+        week_start += datetime.timedelta(weeks=interval)
+
+
+def _load_ics(path, default_user):
+    with open(path, "r", encoding="utf-8") as f:
+        # Unfold continuation lines (RFC 5545 3.1)
+        text = re.sub(r"\r?\n[ \t]", "", f.read())
+    until_limit = datetime.datetime.now() + datetime.timedelta(days=RECURRENCE_HORIZON_DAYS)
+    events = []
+    current = None
+    for line in text.splitlines():
+        if line == "BEGIN:VEVENT":
+            current = {}
+        elif line == "END:VEVENT" and current is not None:
+            if "DTSTART" in current:
+                start = _ics_time(*current["DTSTART"])
+                if "DTEND" in current:
+                    end = _ics_time(*current["DTEND"])
+                elif "DURATION" in current and _ics_duration(current["DURATION"][0]):
+                    end = start + _ics_duration(current["DURATION"][0])
+                elif len(current["DTSTART"][0]) == 8:
+                    end = start + datetime.timedelta(days=1)
+                else:
+                    end = start + datetime.timedelta(minutes=DEFAULT_EVENT_MINUTES)
+                event = Event(current.get("SUMMARY", ("Busy",))[0], start, end)
+                if "RRULE" in current:
+                    events.extend(_expand_rrule(event, current["RRULE"][0], until_limit))
+                else:
+                    events.append(event)
+            current = None
+        elif current is not None and ":" in line:
+            name, value = line.split(":", 1)
+            name, _, params = name.partition(";")
+            current[name.upper()] = (value.strip(), params.upper())
+    return {default_user: events}
+
+
+def load_events(path) -> Dict[str, List[Event]]:
+    """
+    Read {user_id: [Event, ...]} from a calendar file or a directory of them.
+
+    .ics files hold one user's calendar; the user id is the file name stem
+    (calendars/me.ics -> "me"). .json files hold either a list of events
+    ({"title", "start", "end"} or "duration_minutes", optional "user_id") or
+    a {user_id: [event, ...]} mapping.
+    ICS times with TZID are taken as local time; UTC (...Z) times are converted.
+    DAILY/WEEKLY recurrence rules are expanded up to RECURRENCE_HORIZON_DAYS.
+    """
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    events = {}
+    for p in paths:
+        user_id = os.path.splitext(os.path.basename(p))[0]
+        if p.lower().endswith(".ics"):
+            loaded = _load_ics(p, user_id)
+        elif p.lower().endswith(".json"):
+            loaded = _load_json(p, user_id)
+        else:
+            continue
+        for uid, items in loaded.items():
+            events.setdefault(uid, []).extend(items)
+    return events
+
+
+class UserCalendar:
+    """Sorted-array interval index over one user's events."""
+
+    def __init__(self, events):
+        self.events = sorted((e for e in events if e.end > e.start), key=lambda e: (e.start, e.end))
+        self.starts = [e.start for e in self.events]
+        # max_ends[i] = latest end among events[:i + 1]; non-decreasing, so bisectable
+        self.max_ends = list(accumulate((e.end for e in self.events), max))
+
+        busy_starts, busy_ends = [], []
+        for e in self.events:
+            if busy_ends and e.start <= busy_ends[-1]:
+                busy_ends[-1] = max(busy_ends[-1], e.end)
+            else:
+                busy_starts.append(e.start)
+                busy_ends.append(e.end)
+        self.busy_starts = busy_starts
+        self.busy_ends = busy_ends
+
+    def events_between(self, start, end, limit=None):
+        """Events overlapping [start, end), by start time."""
+        lo = bisect.bisect_right(self.max_ends, start)
+        hi = bisect.bisect_left(self.starts, end)
+        found = []
+        for i in range(lo, hi):
+            if self.events[i].end > start:
+                found.append(self.events[i])
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def busy(self, start, end) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+        """Merged busy intervals overlapping [start, end), clipped to it."""
+        i = bisect.bisect_right(self.busy_ends, start)
+        out = []
+        while i < len(self.busy_starts) and self.busy_starts[i] < end:
+            out.append((max(self.busy_starts[i], start), min(self.busy_ends[i], end)))
+            i += 1
+        return out
+
+    def free(self, start, end) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+        """Gaps in [start, end) not covered by any event."""
+        out = []
+        cursor = start
+        for b_start, b_end in self.busy(start, end):
+            if b_start > cursor:
+                out.append((cursor, b_start))
+            cursor = max(cursor, b_end)
+        if cursor < end:
+            out.append((cursor, end))
+        return out
+
+    def is_free(self, start, end):
+        i = bisect.bisect_right(self.busy_ends, start)
+        return i >= len(self.busy_starts) or self.busy_starts[i] >= end
+
+    def next_free_slots(self, start, end, count=4, duration=datetime.timedelta(minutes=30),
+                        work_hours=(9, 18), step=datetime.timedelta(minutes=30)):
+        """
+        Up to `count` free slot start times of `duration` in [start, end).
+
+        Slots fall inside `work_hours` (start hour, end hour) on weekdays and
+        are aligned to `step` past the hour.
+        """
+        slots = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end and len(slots) < count:
+            if day.weekday() < 5:
+                day_start = max(start, day.replace(hour=work_hours[0]))
+                day_end = min(end, day.replace(hour=work_hours[1]))
+                for gap_start, gap_end in self.free(day_start, day_end) if day_start < day_end else ():
+                    slot = _align(gap_start, day, step)
+                    while slot + duration <= gap_end and len(slots) < count:
+                        slots.append(slot)
+                        slot += step
+                    if len(slots) >= count:
+                        break
+            day += datetime.timedelta(days=1)
+        return slots
+
+
+def _align(moment, day, step):
+    # Round up to the next multiple of `step` counted from midnight
+    offset = moment - day
+    steps = -(-offset // step)
+    return day + steps * step
+
+
+class CalendarIndex:
+    """Per-user calendars; unknown users have empty (always free) calendars."""
+
+    def __init__(self, events_by_user: Dict[str, List[Event]]):
+        self.users = {user_id: UserCalendar(events) for user_id, events in events_by_user.items()}
+        self._empty = UserCalendar([])
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_events(path))
+
+    def user(self, user_id) -> UserCalendar:
+        return self.users.get(user_id, self._empty)
+
+
+def parse_date_hint(date_hint: Optional[str], now: datetime.datetime, default_days=14):
+    """
+    Turn a free-text date hint into a query window (start, end, description).
+
+    Understands ISO dates, "today", "tomorrow", weekday names ("friday",
+    "next monday"), "this week", "next week", "in N days" and "morning" /
+    "afternoon" / "evening". Anything else means the next `default_days` days.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    default = (now, today + datetime.timedelta(days=default_days), f"next {default_days} days")
+    hint = (date_hint or "").strip().lower()
+    if not hint:
+        return default
+
+    day = None
+    span = datetime.timedelta(days=1)
+    iso = re.search(r"\d{4}-\d{2}-\d{2}", hint)
+    in_days = re.search(r"in (\d+) days?", hint)
+    weekday = next((i for i, name in enumerate(_WEEKDAYS) if name in hint), None)
+    if iso:
+        try:
+            day = datetime.datetime.strptime(iso.group(0), "%Y-%m-%d")
+        except ValueError:
+            day = None
+    elif "today" in hint:
+        day = today
+    elif "tomorrow" in hint:
+        day = today + datetime.timedelta(days=1)
+    elif in_days:
+        day = today + datetime.timedelta(days=int(in_days.group(1)))
+    elif weekday is not None:
+        ahead = (weekday - today.weekday()) % 7
+        if ahead == 0 or "next" in hint:
+            ahead = ahead or 7
+        day = today + datetime.timedelta(days=ahead)
+    elif "next week" in hint:
+        day = today + datetime.timedelta(days=7 - today.weekday())
+        span = datetime.timedelta(days=7)
+    elif "this week" in hint:
+        day = today
+        span = datetime.timedelta(days=7 - today.weekday())
+    if day is None:
+        return default
+
+    start, end = day, day + span
+    for part, (h_start, h_end) in (("morning", (9, 12)), ("afternoon", (12, 17)), ("evening", (17, 21))):
+        if part in hint and span == datetime.timedelta(days=1):
+            start, end = day.replace(hour=h_start), day.replace(hour=h_end)
+            break
+    start = max(start, now)
+    if start >= end:
+        return default
+    return start, end, f"{start.isoformat(timespec='minutes')} to {end.isoformat(timespec='minutes')}"
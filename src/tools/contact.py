@@ -1,4 +1,6 @@
+import os
 from typing import Dict, Any
+from tools.contact_directory import ContactDirectory
 
 MOCK_CONTACTS = {
     "alice": {"name": "Alice Rao", "email": "alice@company.com", "phone": "+91-90000-11111"},
@@ -7,36 +9,54 @@ MOCK_CONTACTS = {
 }
 
 
+_directory = None
+
+
+def get_directory() -> ContactDirectory:
+    """
+    The contact directory used by lookup_contact, opened once per process.
+
+    CONTACTS_PATH may point to a .csv (name,email,phone[,alias]) or .jsonl
+    contact file; its index is memory-mapped from <file>.idx. Without it the
+    mock contacts above are used, with their keys as aliases.
+    """
+    global _directory
+    if _directory is None:
+        path = os.getenv("CONTACTS_PATH")
+        if path:
+            _directory = ContactDirectory.open(path)
+        else:
+            _directory = ContactDirectory.from_records([
+                (info["name"], info["email"], info["phone"], key if "@" not in key else "")
+                for key, info in MOCK_CONTACTS.items()
+            ])
+    return _directory
+
+
 def lookup_contact(query: str) -> Dict[str, Any]:
     """
-    Lookup a contact by name or email (simple mock).
+    Lookup a contact by name or email in the contact directory.
 
     Args:
-        query: name or email string
+        query: name or email string (full or partial)
 
     Returns:
-        dict with contact details or a not-found message
+        dict with the best-ranked contact's details or a not-found message
     """
-    q = query.strip().lower()
-    if q in MOCK_CONTACTS:
-        found = MOCK_CONTACTS[q]
+    matches = get_directory().search(query, limit=1)
+    if matches:
         return {
             "tool": "lookup_contact",
             "query": query,
             "found": True,
-            "contact": found,
+            "contact": matches[0][1],
         }
 
-    # Try basic name match
-    for key, info in MOCK_CONTACTS.items():
-        if q in key or q in info["name"].lower() or q in info["email"].lower():
-            return {"tool": "lookup_contact", "query": query, "found": True, "contact": info}
-
     return {
         "tool": "lookup_contact",
         "query": query,
         "found": False,
-        "message": "No contact found in mock contacts",
+        "message": "No contact found in contact directory",
     }
 
 
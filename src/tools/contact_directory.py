@@ -0,0 +1,260 @@
+"""Indexed contact directory behind lookup_contact.
+
+Contacts are loaded from a CSV (header: name,email,phone[,alias]) or JSONL file
+and compiled once into a compact binary index next to the source
+(<source>.idx). Later starts mmap that file instead of re-parsing the source;
+it is rebuilt automatically when the source's size or mtime changes.
+
+Index layout (little-endian, every section 8-byte aligned):
+
+    header      magic, version, record count, source size/mtime, section table
+    records     UTF-8 "name\\x1femail\\x1fphone\\x1falias" blobs + u64 offsets
+    keys        sorted UTF-8 keys + u64 offsets, u32 record id and u8 kind per key
+                (email, alias, full name, name token, email local part)
+    trigrams    sorted UTF-8 trigrams + u64 offsets, u64 posting offsets, u32 postings
+
+Exact and prefix lookups binary-search the key table; substring queries of 3+
+characters walk the rarest trigram's posting list and verify each candidate.
+Shorter substring queries have no trigram and scan the records in order.
+"""
+import csv
+import json
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b"CDIR"
+VERSION = 1
+_HEADER = struct.Struct("<4sIQQq")           # magic, version, records, source size, source mtime_ns
+_SECTION = struct.Struct("<QQ")              # offset, length
+_SECTIONS = ("rec_blob", "rec_off", "key_blob", "key_off", "key_rid", "key_kind",
+             "tri_blob", "tri_off", "post_off", "post_ids")
+_SEP = "\x1f"
+
+# Key kinds, highest rank first
+KIND_EMAIL, KIND_ALIAS, KIND_NAME, KIND_TOKEN, KIND_LOCAL = range(5)
+_EXACT_SCORE = {KIND_EMAIL: 100, KIND_ALIAS: 95, KIND_NAME: 90, KIND_TOKEN: 80, KIND_LOCAL: 75}
+_PREFIX_SCORE = {KIND_EMAIL: 60, KIND_ALIAS: 65, KIND_NAME: 70, KIND_TOKEN: 70, KIND_LOCAL: 60}
+_SUBSTRING_SCORE = 40
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _keys_for(record):
+    name, email, _, alias = (v.strip().lower() for v in record)
+    keys = []
+    if email:
+        keys.append((email, KIND_EMAIL))
+        keys.append((email.split("@", 1)[0], KIND_LOCAL))
+    if alias:
+        keys.append((alias, KIND_ALIAS))
+    if name:
+        keys.append((name, KIND_NAME))
+        keys.extend((token, KIND_TOKEN) for token in name.split() if token != name)
+    return keys
+
+
+def load_records(path):
+    """Read (name, email, phone, alias) tuples from a .csv or .jsonl file."""
+    records = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if path.endswith(".csv") else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            records.append(tuple(str(row.get(k) or "") for k in ("name", "email", "phone", "alias")))
+    return records
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def build_index(records, source_size=0, source_mtime_ns=0):
+    """Compile records into the binary index format; returns bytes."""
+    rec_blob, rec_off = bytearray(), array("Q", [0])
+    key_entries = []
+    postings = {}
+    for rid, record in enumerate(records):
+        rec_blob += _SEP.join(v.replace(_SEP, " ") for v in record).encode("utf-8")
+        rec_off.append(len(rec_blob))
+        for key, kind in _keys_for(record):
+            key_entries.append((key.encode("utf-8"), kind, rid))
+        name, email, _, alias = (v.lower() for v in record)
+        for text in (name, email, alias):
+            for gram in _trigrams(text):
+                postings.setdefault(gram.encode("utf-8"), set()).add(rid)
+
+    key_entries.sort()
+    key_blob, key_off = bytearray(), array("Q", [0])
+    key_rid, key_kind = array("I"), bytearray()
+    for key, kind, rid in key_entries:
+        key_blob += key
+        key_off.append(len(key_blob))
+        key_rid.append(rid)
+        key_kind.append(kind)
+
+    tri_blob, tri_off = bytearray(), array("Q", [0])
+    post_off, post_ids = array("Q", [0]), array("I")
+    for gram in sorted(postings):
+        tri_blob += gram
+        tri_off.append(len(tri_blob))
+        post_ids.extend(sorted(postings[gram]))
+        post_off.append(len(post_ids))
+
+    sections = [rec_blob, rec_off.tobytes(), key_blob, key_off.tobytes(), key_rid.tobytes(),
+                bytes(key_kind), tri_blob, tri_off.tobytes(), post_off.tobytes(), post_ids.tobytes()]
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(records), source_size, source_mtime_ns))
+    table_at = len(out)
+    out += b"\0" * (_SECTION.size * len(sections))
+    _pad(out)
+    table = []
+    for data in sections:
+        table.append((len(out), len(data)))
+        out += data
+        _pad(out)
+    for i, entry in enumerate(table):
+        _SECTION.pack_into(out, table_at + i * _SECTION.size, *entry)
+    return bytes(out)
+
+
+class ContactDirectory:
+    """Read-only view over an index buffer (an mmap for file-backed directories)."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        mv = memoryview(buffer)
+        magic, version, self.size, self.source_size, self.source_mtime_ns = _HEADER.unpack_from(mv, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a contact directory index (or built by another version)")
+        s = {}
+        for i, name in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(mv, _HEADER.size + i * _SECTION.size)
+            s[name] = mv[offset:offset + length]
+        self._rec_blob = s["rec_blob"]
+        self._rec_off = s["rec_off"].cast("Q")
+        self._key_blob = s["key_blob"]
+        self._key_off = s["key_off"].cast("Q")
+        self._key_rid = s["key_rid"].cast("I")
+        self._key_kind = s["key_kind"]
+        self._tri_blob = s["tri_blob"]
+        self._tri_off = s["tri_off"].cast("Q")
+        self._post_off = s["post_off"].cast("Q")
+        self._post_ids = s["post_ids"].cast("I")
+
+    @classmethod
+    def from_records(cls, records):
+        """In-memory directory, e.g. for the built-in mock contacts."""
+        return cls(build_index(records))
+
+    @classmethod
+    def open(cls, source_path, index_path=None):
+        """mmap the index for `source_path`, (re)building it first if missing or stale."""
+        index_path = index_path or source_path + ".idx"
+        st = os.stat(source_path)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                head = f.read(_HEADER.size)
+            fresh = False
+            if len(head) == _HEADER.size:
+                magic, version, _, size, mtime_ns = _HEADER.unpack(head)
+                fresh = (magic, version, size, mtime_ns) == (MAGIC, VERSION, st.st_size, st.st_mtime_ns)
+            if not fresh:
+                os.remove(index_path)
+        if not os.path.exists(index_path):
+            data = build_index(load_records(source_path), st.st_size, st.st_mtime_ns)
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, index_path)
+        with open(index_path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def get(self, rid):
+        raw = bytes(self._rec_blob[self._rec_off[rid]:self._rec_off[rid + 1]]).decode("utf-8")
+        name, email, phone, alias = raw.split(_SEP)
+        return {"name": name, "email": email, "phone": phone}
+
+    def _key(self, i):
+        return bytes(self._key_blob[self._key_off[i]:self._key_off[i + 1]])
+
+    def _key_range(self, prefix):
+        # [lo, hi) of keys starting with `prefix`
+        n = len(self._key_rid)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start, hi = lo, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:len(prefix)] == prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def _postings(self, gram):
+        gram = gram.encode("utf-8")
+        lo, hi = 0, len(self._tri_off) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._tri_blob[self._tri_off[mid]:self._tri_off[mid + 1]]) < gram:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._tri_off) - 1 and bytes(self._tri_blob[self._tri_off[lo]:self._tri_off[lo + 1]]) == gram:
+            return self._post_ids[self._post_off[lo]:self._post_off[lo + 1]]
+        return ()
+
+    def search(self, query, limit=5, max_prefix_keys=2000):
+        """
+        Ranked contacts for `query` (name, alias or email; full or partial).
+
+        Exact key matches rank highest, then prefixes of names/tokens/emails,
+        then substrings anywhere in the name, email or alias. Returns
+        [(score, contact), ...] best first.
+        """
+        q = query.strip().lower()
+        if not q:
+            return []
+        scores = {}
+        qb = q.encode("utf-8")
+
+        start, end = self._key_range(qb)
+        for i in range(start, min(end, start + max_prefix_keys)):
+            kind = self._key_kind[i]
+            score = _EXACT_SCORE[kind] if self._key(i) == qb else _PREFIX_SCORE[kind]
+            rid = self._key_rid[i]
+            if score > scores.get(rid, 0):
+                scores[rid] = score
+
+        # Substring hits score below every key hit, so they only matter when keys found too few
+        if len(scores) < limit:
+            # Walk the rarest trigram's (sorted) posting list, or every record for
+            # 1-2 character queries. Substring hits tie, so they rank by record id
+            # and the first `needed` verified ids are the answer
+            if len(q) >= 3:
+                candidates = min((self._postings(gram) for gram in _trigrams(q)), key=len)
+            else:
+                candidates = range(self.size)
+            needed = limit - len(scores)
+            for rid in candidates:
+                if needed <= 0:
+                    break
+                if rid in scores:
+                    continue
+                raw = bytes(self._rec_blob[self._rec_off[rid]:self._rec_off[rid + 1]]).decode("utf-8").lower()
+                name, email, _, alias = raw.split(_SEP)
+                # Trigrams can match across fields; confirm a real substring
+                if q in name or q in email or q in alias:
+                    scores[rid] = _SUBSTRING_SCORE
+                    needed -= 1
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score, self.get(rid)) for rid, score in ranked]
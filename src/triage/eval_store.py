@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+import sqlite_utils
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "eval_predictions.db"
+)
+
+
+def email_input_hash(email):
+    """Hash of the fields the classifier reads; a changed email gets reclassified."""
+    raw = json.dumps(
+        [email.get("subject", ""), email.get("body", ""), email.get("sender", "")],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PredictionStore:
+    """
+    Per-email predictions from earlier evaluation runs.
+
+    Each row keeps the email's input hash and the classifier fingerprint that
+    produced the prediction, so a rerun only has to classify rows where either
+    one changed.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        self.db = sqlite_utils.Database(sqlite3.connect(path))
+        self.table = self.db["predictions"]
+        if not self.table.exists():
+            self.table.create(
+                {"email_key": str, "input_hash": str, "fingerprint": str, "predicted": str},
+                pk="email_key",
+            )
+
+    def lookup(self, keys):
+        """Return {email_key: (input_hash, fingerprint, predicted)} for the keys that exist."""
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.db.execute(
+                "SELECT email_key, input_hash, fingerprint, predicted FROM predictions"
+                f" WHERE email_key IN ({', '.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for email_key, input_hash, fingerprint, predicted in rows:
+                found[email_key] = (input_hash, fingerprint, predicted)
+        return found
+
+    def save(self, rows):
+        """Upsert (email_key, input_hash, fingerprint, predicted) tuples in one transaction."""
+        with self.db.conn:
+            self.table.upsert_all(
+                (
+                    {"email_key": k, "input_hash": h, "fingerprint": f, "predicted": p}
+                    for k, h, f, p in rows
+                ),
+                pk="email_key",
+            )
@@ -0,0 +1,430 @@
+"""Local kNN classifier tier between the rules and the LLM.
+
+Emails are embedded with a network-free hashing vectorizer and compared with
+labeled examples in a faiss inner-product index. A confident
+nearest-neighbour vote answers the email without an LLM call.
+
+The index lives in one directory:
+  base.faiss + base_labels.npy   built once, memory-mapped (read-only) at start-up
+  delta.f32 + delta_labels.txt   examples added since, appended as they arrive
+  meta.json                      embedder settings, label names, review-queue sync position
+compact() folds the delta into a new base.
+TriageNode consults the tier only when created with knn=True (or given a KnnTier).
+
+Run from src/:
+  python -m triage.knn_tier build --golden ../data/golden_emails.json --review-db ../data/review_queue.db
+  python -m triage.knn_tier sync --review-db ../data/review_queue.db
+  python -m triage.knn_tier compact
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+
+from utils.metrics import METRICS
+
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "knn_index"
+)
+DEFAULT_GOLDEN_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "golden_emails.json"
+)
+
+METRICS.describe("knn_tier_total", "kNN tier lookups by result (confident, abstain)")
+METRICS.describe("knn_examples_added_total", "Labeled examples appended to the kNN index")
+
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+_NUMBER = re.compile(r"[0-9]+")
+_WORD = re.compile(r"[^\W_]+")
+
+
+class HashingEmbedder:
+    """
+    Network-free email embedding: signed feature hashing of word unigrams and
+    bigrams into `dim` buckets, log-scaled counts, L2-normalized.
+
+    Subject words are hashed separately from body words and weighted by
+    `subject_weight`. Links, addresses and digits are normalized first.
+    Uses crc32, so vectors are stable across processes and can be persisted.
+    """
+
+    def __init__(self, dim=1024, subject_weight=2.0, max_chars=8192):
+        self.dim = dim
+        self.subject_weight = subject_weight
+        self.max_chars = max_chars
+
+    def config(self):
+        return {"dim": self.dim, "subject_weight": self.subject_weight, "max_chars": self.max_chars}
+
+    def _features(self, text, prefix, counts):
+        text = _NUMBER.sub("0", _URL.sub(" url ", text[:self.max_chars].lower()))
+        words = ["addr" if "@" in w else w for w in text.split()]
+        words = [t for w in words for t in _WORD.findall(w)]
+        for feature in words:
+            key = prefix + feature
+            counts[key] = counts.get(key, 0) + 1
+        for a, b in zip(words, words[1:]):
+            key = f"{prefix}{a} {b}"
+            counts[key] = counts.get(key, 0) + 1
+
+    def embed(self, subject, body):
+        import numpy as np
+        subject_counts, body_counts = {}, {}
+        self._features(subject or "", "s:", subject_counts)
+        self._features(body or "", "", body_counts)
+        buckets, weights = [], []
+        for counts, weight in ((subject_counts, self.subject_weight), (body_counts, 1.0)):
+            for feature, count in counts.items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                buckets.append(h % self.dim)
+                value = weight * (1.0 + math.log(count))
+                weights.append(value if h & 0x80000000 else -value)
+        vector = np.bincount(buckets, weights=weights, minlength=self.dim).astype(np.float32) \
+            if buckets else np.zeros(self.dim, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, emails):
+        """(n, dim) float32 matrix for an iterable of (subject, body)."""
+        import numpy as np
+        rows = [self.embed(subject, body) for subject, body in emails]
+        return np.vstack(rows) if rows else np.zeros((0, self.dim), dtype=np.float32)
+
+
+def _write_meta(index_dir, meta):
+    os.makedirs(index_dir, exist_ok=True)
+    tmp = os.path.join(index_dir, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(index_dir, "meta.json"))
+
+
+def _faiss():
+    # faiss and numpy are imported when an index is opened or built, not with this module
+    import faiss
+    return faiss
+
+
+def read_labeled(path):
+    """Labeled emails from a JSON array or JSONL file; the label is "human_label" (or "label")."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = json.load(f)
+    for row in rows:
+        label = row.get("human_label") or row.get("label")
+        if label:
+            yield {"subject": row.get("subject", ""), "body": row.get("body", ""), "sender": row.get("sender", ""), "label": label}
+
+
+def confirmed_from_review_queue(queue, after_decision_id=0):
+    """
+    (examples, last decision id) for emails a reviewer approved after
+    `after_decision_id`: their triage label is then a confirmed label.
+    """
+    examples, last_id, cursor = [], after_decision_id, None
+    while True:
+        rows, cursor = queue.decisions(cursor=cursor)
+        fresh = [row for row in rows if row["id"] > after_decision_id]
+        for row in fresh:
+            last_id = max(last_id, row["id"])
+            if row["decision"] != "approved" or not row["label"]:
+                continue
+            item = queue.get(row["item_id"])
+            email = (item or {}).get("email") or {}
+            examples.append({"subject": email.get("subject", ""), "body": email.get("body", ""), "label": row["label"]})
+        # Decisions come newest first; stop at the first page reaching already-synced ones
+        if cursor is None or len(fresh) < len(rows):
+            break
+    examples.reverse()
+    return examples, last_id
+
+
+class KnnTier:
+    """
+    Nearest-neighbour label votes over labeled, embedded emails.
+
+    classify() returns a result only when the vote is confident: at least
+    `min_votes` of the `k` nearest examples with cosine similarity of
+    `min_similarity` or more, and the winning label holding `vote_threshold`
+    of their similarity-weighted vote. Otherwise it abstains (None) and the
+    caller falls through to the LLM.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, k=7, min_similarity=0.35, vote_threshold=0.75,
+                 min_votes=2, embedder=None):
+        self.index_dir = index_dir
+        self.k = k
+        self.min_similarity = min_similarity
+        self.vote_threshold = vote_threshold
+        self.min_votes = min_votes
+        self._lock = threading.Lock()
+
+        meta = self._read_meta()
+        if embedder is None:
+            embedder = HashingEmbedder(**meta["embedder"]) if meta else HashingEmbedder()
+        elif meta and meta["embedder"] != embedder.config():
+            raise ValueError(f"Index in {index_dir} was built with {meta['embedder']}; rebuild it for {embedder.config()}")
+        self.embedder = embedder
+        self.meta = meta or {"embedder": embedder.config(), "labels": [], "review_watermark": 0}
+        self._load()
+
+    # --- files ---------------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        _write_meta(self.index_dir, self.meta)
+
+    def _load(self):
+        import numpy as np
+        faiss = _faiss()
+        self._digest = None
+        self._base, self._base_labels = None, np.zeros(0, dtype=np.int16)
+        if os.path.exists(self._path("base.faiss")):
+            # Memory-mapped where this faiss version supports it for flat indexes (never add() to it)
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+            self._base = faiss.read_index(self._path("base.faiss"), flags)
+            self._base_labels = np.load(self._path("base_labels.npy"), mmap_mode="r")
+
+        dim = self.embedder.dim
+        self._delta = faiss.IndexFlatIP(dim)
+        self._delta_labels = []
+        vectors_path, labels_path = self._path("delta.f32"), self._path("delta_labels.txt")
+        if os.path.exists(vectors_path) and os.path.exists(labels_path):
+            vectors = np.fromfile(vectors_path, dtype=np.float32)
+            with open(labels_path, "r", encoding="utf-8") as f:
+                labels = f.read().splitlines()
+            count = min(len(vectors) // dim, len(labels))
+            if count * dim != len(vectors) or count != len(labels):
+                # A crash between the two appends; drop the unmatched tail
+                with open(vectors_path, "r+b") as f:
+                    f.truncate(count * dim * 4)
+                with open(labels_path, "w", encoding="utf-8") as f:
+                    f.writelines(label + "\n" for label in labels[:count])
+            if count:
+                self._delta.add(vectors[:count * dim].reshape(count, dim))
+                self._delta_labels = labels[:count]
+
+    # --- building and updating -----------------------------------------------
+
+    @classmethod
+    def build(cls, examples, index_dir=DEFAULT_INDEX_DIR, embedder=None, review_watermark=0, **kwargs):
+        """Write a fresh base index from {"subject", "body", "label"} examples; any delta is dropped."""
+        import numpy as np
+        faiss = _faiss()
+        embedder = embedder or HashingEmbedder()
+        examples = list(examples)
+        labels = sorted({e["label"] for e in examples})
+        codes = np.array([labels.index(e["label"]) for e in examples], dtype=np.int16)
+        index = faiss.IndexFlatIP(embedder.dim)
+        if examples:
+            index.add(embedder.embed_many((e["subject"], e["body"]) for e in examples))
+
+        os.makedirs(index_dir, exist_ok=True)
+        faiss.write_index(index, os.path.join(index_dir, "base.faiss.tmp"))
+        os.replace(os.path.join(index_dir, "base.faiss.tmp"), os.path.join(index_dir, "base.faiss"))
+        np.save(os.path.join(index_dir, "base_labels.npy"), codes)
+        for name in ("delta.f32", "delta_labels.txt"):
+            if os.path.exists(os.path.join(index_dir, name)):
+                os.remove(os.path.join(index_dir, name))
+        _write_meta(index_dir, {"embedder": embedder.config(), "labels": labels, "review_watermark": review_watermark})
+        return cls(index_dir, embedder=embedder, **kwargs)
+
+    def add_many(self, examples):
+        """Append {"subject", "body", "label"} examples; searchable at once and persisted to the delta files."""
+        examples = list(examples)
+        if not examples:
+            return 0
+        vectors = self.embedder.embed_many((e["subject"], e["body"]) for e in examples)
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            if not os.path.exists(self._path("meta.json")):
+                self._write_meta()
+            with open(self._path("delta.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._path("delta_labels.txt"), "a", encoding="utf-8") as f:
+                f.writelines(e["label"] + "\n" for e in examples)
+            self._delta.add(vectors)
+            self._delta_labels.extend(e["label"] for e in examples)
+            self._digest = None
+        METRICS.inc("knn_examples_added_total", value=len(examples))
+        return len(examples)
+
+    def add(self, subject, body, label):
+        return self.add_many([{"subject": subject, "body": body, "label": label}])
+
+    def sync_review_queue(self, queue):
+        """Add labels approved in the HITL review queue since the last sync; returns how many."""
+        examples, last_id = confirmed_from_review_queue(queue, self.meta.get("review_watermark", 0))
+        added = self.add_many(examples)
+        if last_id != self.meta.get("review_watermark", 0):
+            self.meta["review_watermark"] = last_id
+            self._write_meta()
+        return added
+
+    def compact(self):
+        """Fold the delta into a new memory-mapped base."""
+        import numpy as np
+        with self._lock:
+            vectors, labels = [], []
+            if self._base is not None and self._base.ntotal:
+                vectors.append(self._base.reconstruct_n(0, self._base.ntotal))
+                labels.extend(self.meta["labels"][code] for code in self._base_labels)
+            if self._delta.ntotal:
+                vectors.append(self._delta.reconstruct_n(0, self._delta.ntotal))
+                labels.extend(self._delta_labels)
+            # Release the mapping before the file underneath it is replaced
+            self._base = None
+        dim = self.embedder.dim
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+        faiss = _faiss()
+        names = sorted(set(labels))
+        index = faiss.IndexFlatIP(dim)
+        if len(matrix):
+            index.add(matrix)
+        faiss.write_index(index, self._path("base.faiss.tmp"))
+        os.replace(self._path("base.faiss.tmp"), self._path("base.faiss"))
+        np.save(self._path("base_labels.npy"), np.array([names.index(l) for l in labels], dtype=np.int16))
+        for name in ("delta.f32", "delta_labels.txt"):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        self.meta["labels"] = names
+        self._write_meta()
+        with self._lock:
+            self._load()
+
+    # --- lookups -------------------------------------------------------------
+
+    def __len__(self):
+        return (self._base.ntotal if self._base is not None else 0) + self._delta.ntotal
+
+    def _content_digest(self):
+        # Hash of the index files (vectors, labels, label names); cached until the index changes
+        with self._lock:
+            if self._digest is None:
+                digest = hashlib.sha256(json.dumps(
+                    {"embedder": self.meta["embedder"], "labels": self.meta["labels"]}, sort_keys=True
+                ).encode("utf-8"))
+                for name in ("base.faiss", "base_labels.npy", "delta.f32", "delta_labels.txt"):
+                    digest.update(name.encode("utf-8"))
+                    if os.path.exists(self._path(name)):
+                        with open(self._path(name), "rb") as f:
+                            for block in iter(lambda: f.read(1 << 20), b""):
+                                digest.update(block)
+                self._digest = digest.hexdigest()[:16]
+            return self._digest
+
+    def fingerprint(self):
+        """Identifies the examples and vote settings; changes whenever the index does."""
+        return (f"knn:{len(self)}:{self._content_digest()}:k={self.k}:"
+                f"sim={self.min_similarity}:vote={self.vote_threshold}:min={self.min_votes}")
+
+    def _neighbors(self, queries):
+        # Per query: [(similarity, label)] from base and delta, best first
+        k = self.k + 1  # one spare for skip_exact
+        found = [[] for _ in range(len(queries))]
+        with self._lock:
+            sources = []
+            if self._base is not None and self._base.ntotal:
+                sources.append((self._base, lambda i: self.meta["labels"][self._base_labels[i]]))
+            if self._delta.ntotal:
+                sources.append((self._delta, self._delta_labels.__getitem__))
+            for index, label_of in sources:
+                similarities, ids = index.search(queries, min(k, index.ntotal))
+                for row, (sims, idx) in enumerate(zip(similarities, ids)):
+                    found[row].extend((float(s), label_of(int(i))) for s, i in zip(sims, idx) if i >= 0)
+        return [sorted(neighbors, reverse=True) for neighbors in found]
+
+    def _vote(self, neighbors, skip_exact):
+        if skip_exact:
+            neighbors = [n for n in neighbors if n[0] < 0.9999]
+        close = [n for n in neighbors[:self.k] if n[0] >= self.min_similarity]
+        if len(close) < self.min_votes:
+            return None
+        votes = {}
+        for similarity, label in close:
+            votes[label] = votes.get(label, 0.0) + similarity
+        label, weight = max(votes.items(), key=lambda item: item[1])
+        share = weight / sum(votes.values())
+        if share < self.vote_threshold or sum(1 for n in close if n[1] == label) < self.min_votes:
+            return None
+        return {"label": label, "confidence": round(share, 4), "source": "knn"}
+
+    def classify_many(self, emails, skip_exact=False):
+        """
+        Results for (subject, body) pairs, in order; None where the vote is not confident.
+        skip_exact ignores examples identical to the query, e.g. when evaluating
+        on the same emails the index was seeded from.
+        """
+        emails = list(emails)
+        if not emails or not len(self):
+            return [None] * len(emails)
+        queries = self.embedder.embed_many(emails)
+        results = [self._vote(neighbors, skip_exact) for neighbors in self._neighbors(queries)]
+        for result in results:
+            METRICS.inc("knn_tier_total", {"result": "confident" if result else "abstain"})
+        return results
+
+    def classify(self, subject, body, skip_exact=False):
+        return self.classify_many([(subject, body)], skip_exact=skip_exact)[0]
+
+
+def open_default(index_dir=DEFAULT_INDEX_DIR, **kwargs):
+    """The KnnTier in `index_dir`, or None if no index has been built there yet."""
+    if not os.path.exists(os.path.join(index_dir, "meta.json")):
+        return None
+    return KnnTier(index_dir, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and maintain the kNN triage index")
+    parser.add_argument("command", choices=["build", "sync", "compact", "stats"])
+    parser.add_argument("--dir", type=str, default=DEFAULT_INDEX_DIR, help="Index directory")
+    parser.add_argument("--golden", type=str, default=DEFAULT_GOLDEN_PATH, help="Labeled emails to seed the index (build)")
+    parser.add_argument("--review-db", type=str, default=None, help="Add labels approved in this HITL review queue")
+    args = parser.parse_args()
+
+    queue = None
+    if args.review_db:
+        from dashboard.review_queue import ReviewQueue
+        queue = ReviewQueue(args.review_db)
+
+    if args.command == "build":
+        examples, watermark = list(read_labeled(args.golden)), 0
+        if queue is not None:
+            confirmed, watermark = confirmed_from_review_queue(queue)
+            examples += confirmed
+        tier = KnnTier.build(examples, args.dir, review_watermark=watermark)
+        print(f"Built {args.dir} with {len(tier)} examples")
+    elif args.command == "sync":
+        if queue is None:
+            parser.error("sync needs --review-db")
+        tier = KnnTier(args.dir)
+        print(f"Added {tier.sync_review_queue(queue)} confirmed labels ({len(tier)} examples)")
+    elif args.command == "compact":
+        tier = KnnTier(args.dir)
+        tier.compact()
+        print(f"Compacted {args.dir} ({len(tier)} examples)")
+    else:
+        tier = KnnTier(args.dir)
+        print(json.dumps({
+            "examples": len(tier),
+            "base": tier._base.ntotal if tier._base is not None else 0,
+            "delta": tier._delta.ntotal,
+            "labels": tier.meta["labels"],
+            "review_watermark": tier.meta.get("review_watermark", 0),
+        }, indent=2))
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import sqlite_utils
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "llm_cache.db"
+)
+
+_WS = re.compile(r"\s+")
+
+
+def cache_key(subject, body, model, prompt_version):
+    """Hash of the normalized email plus the model and prompt that classified it.
+
+    Case and whitespace differences do not change the key, so re-sent
+    notifications and reformatted copies share one entry.
+    """
+    text = _WS.sub(" ", f"{subject}\n{body}").strip().lower()
+    raw = "\x1f".join([model, prompt_version, text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """
+    Two-level cache for LLM classifications.
+
+    Level 1 is an in-memory LRU of `memory_size` entries. Level 2 is a SQLite
+    table (via sqlite-utils) that survives restarts; entries expire after
+    `ttl_seconds` and the oldest are evicted once the table exceeds `max_entries`.
+    Pass path=None for a memory-only cache.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=2048,
+                 ttl_seconds=7 * 24 * 3600, max_entries=200_000):
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+        self.db = None
+        if path:
+            out_dir = os.path.dirname(path)
+            if out_dir and not os.path.exists(out_dir):
+                os.makedirs(out_dir, exist_ok=True)
+            self.db = sqlite_utils.Database(sqlite3.connect(path, check_same_thread=False))
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.table = self.db["llm_cache"]
+            if not self.table.exists():
+                self.table.create(
+                    {"key": str, "label": str, "confidence": float, "created_at": float},
+                    pk="key",
+                )
+                self.table.create_index(["created_at"])
+
+    def get(self, key):
+        """Return the cached {"label", "confidence"} or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[2] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return {"label": entry[0], "confidence": entry[1]}
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT label, confidence, created_at FROM llm_cache WHERE key = ?", [key]
+                ).fetchone()
+                if row is not None and now - row[2] < self.ttl_seconds:
+                    self._remember(key, row)
+                    self.stats["disk_hits"] += 1
+                    return {"label": row[0], "confidence": row[1]}
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, label, confidence):
+        entry = (label, confidence, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self.stats["writes"] += 1
+            if self.db is None:
+                return
+            self.table.upsert(
+                {"key": key, "label": label, "confidence": confidence, "created_at": entry[2]},
+                pk="key",
+            )
+            self.db.conn.commit()
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 1000:
+                self._evict()
+
+    def _remember(self, key, entry):
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Drop expired rows, then the oldest rows beyond max_entries
+        self._writes_since_evict = 0
+        cutoff = time.time() - self.ttl_seconds
+        expired = self.db.execute("DELETE FROM llm_cache WHERE created_at < ?", [cutoff]).rowcount
+        overflow = self.db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            [self.max_entries],
+        ).rowcount
+        self.db.conn.commit()
+        self.stats["evicted"] += max(expired, 0) + max(overflow, 0)
+
+    def evict(self):
+        """Run TTL and size eviction now instead of waiting for the next 1000 writes."""
+        with self._lock:
+            if self.db is not None:
+                self._evict()
+
+    def snapshot(self):
+        """Hit/miss counters plus the overall hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import METRICS
+
+METRICS.describe("triage_near_duplicate_total", "Near-duplicate lookups by result (hit, miss, too_short); batch_hit counts copies within one run_batch")
+METRICS.describe("triage_near_duplicate_evictions_total", "Signatures dropped from the near-duplicate index, by reason")
+
+# Parts of a campaign email that change from copy to copy: links, addresses, numbers
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+_NUMBER = re.compile(r"[0-9]+")
+
+
+def _shingles(subject, body, max_chars):
+    # Distinct word bigrams of the normalized email, as 32-bit hashes
+    text = _NUMBER.sub("0", _URL.sub(" <url> ", f"{subject}\n{body}"[:max_chars].lower()))
+    words = ["<addr>" if "@" in w else w for w in text.split()]
+    return {hash(pair) & 0xFFFFFFFF for pair in zip(words, words[1:])}
+
+
+class NearDuplicateIndex:
+    """
+    Recently classified emails, looked up by MinHash similarity.
+
+    Each email becomes a MinHash signature of its word bigrams, after links,
+    addresses and digits are normalized, so copies of one blast that differ
+    in recipient name, tracking link or order number come out nearly equal.
+
+    threshold: minimum estimated Jaccard similarity for two emails to count
+    as near-duplicates. Signatures are split into bands of `band_rows`
+    values and bucketed by band, so a lookup only compares against the
+    fingerprints sharing a bucket; each bucket keeps its `bucket_size` newest
+    entries, which bounds the work per lookup however many emails are indexed.
+    Memory is bounded by `max_entries` (least recently matched evicted first);
+    entries older than `ttl_seconds` are not reused.
+
+    Shingles use Python's string hash, so signatures are only comparable
+    within one process.
+    """
+
+    def __init__(self, threshold=0.75, num_perm=64, band_rows=4, max_entries=20_000,
+                 ttl_seconds=6 * 3600, bucket_size=8, min_shingles=8, max_chars=8192, seed=7):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        if num_perm % band_rows:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of band_rows ({band_rows})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.band_rows = band_rows
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.bucket_size = bucket_size
+        self.min_shingles = min_shingles
+        self.max_chars = max_chars
+
+        # Multiply-add-shift hash family, one (a, b) pair per permutation; drawn on first use
+        self.seed = seed
+        self._a = self._b = None
+
+        self._entries = OrderedDict()   # signature bytes -> (signature, value, stored_at)
+        self._buckets = {}              # (band, band bytes) -> [signature bytes, ...] oldest first
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "too_short": 0, "stored": 0, "evicted": 0, "expired": 0}
+
+    def signature(self, subject, body):
+        """MinHash signature of an email, or None if it is too short to compare reliably."""
+        shingles = _shingles(subject, body, self.max_chars)
+        if len(shingles) < self.min_shingles:
+            return None
+        import numpy as np
+        if self._a is None:
+            rng = np.random.default_rng(self.seed)
+            self._a = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) | np.uint64(1)
+            self._b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        return ((values[:, None] * self._a + self._b) >> np.uint64(32)).min(axis=0)
+
+    def _band_keys(self, signature):
+        rows = self.band_rows
+        return [(i, signature[i * rows:(i + 1) * rows].tobytes()) for i in range(self.num_perm // rows)]
+
+    def _best_match(self, signature, entries, buckets):
+        # Key of the most similar entry at or above the threshold, or None
+        best, best_similarity = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for candidate in buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = int((entries[candidate][0] == signature).sum()) / self.num_perm
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+        return best
+
+    def _insert(self, key, signature, buckets):
+        for band_key in self._band_keys(signature):
+            bucket = buckets.setdefault(band_key, [])
+            bucket.append(key)
+            if len(bucket) > self.bucket_size:
+                del bucket[0]
+
+    def lookup(self, signature):
+        """Value stored for the most similar indexed near-duplicate, or None."""
+        if signature is None:
+            self.stats["too_short"] += 1
+            METRICS.inc("triage_near_duplicate_total", {"result": "too_short"})
+            return None
+        now = time.time()
+        value = None
+        with self._lock:
+            best = self._best_match(signature, self._entries, self._buckets)
+            if best is not None:
+                _, value, stored_at = self._entries[best]
+                if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+                    self._remove(best)
+                    self.stats["expired"] += 1
+                    METRICS.inc("triage_near_duplicate_evictions_total", {"reason": "ttl"})
+                    best, value = None, None
+                else:
+                    self._entries.move_to_end(best)
+        if best is None:
+            self.stats["misses"] += 1
+            METRICS.inc("triage_near_duplicate_total", {"result": "miss"})
+            return None
+        self.stats["hits"] += 1
+        METRICS.inc("triage_near_duplicate_total", {"result": "hit"})
+        return value
+
+    def add(self, signature, value):
+        """Index `value` (e.g. a triage result) under `signature`; None is ignored."""
+        if signature is None:
+            return
+        key = signature.tobytes()
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (signature, value, time.time())
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (signature, value, time.time())
+            self._insert(key, signature, self._buckets)
+            self.stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evicted"] += 1
+                METRICS.inc("triage_near_duplicate_evictions_total", {"reason": "capacity"})
+
+    def group(self, signatures):
+        """
+        For a batch of signatures, the position of the first earlier signature
+        each one near-duplicates, or its own position if none (or None).
+        Lets a batch send one copy of each blast to the classifier.
+        """
+        entries, buckets, firsts = {}, {}, []
+        for i, signature in enumerate(signatures):
+            if signature is None:
+                firsts.append(i)
+                continue
+            best = self._best_match(signature, entries, buckets)
+            if best is not None:
+                firsts.append(entries[best][1])
+                continue
+            key = signature.tobytes()
+            if key not in entries:
+                entries[key] = (signature, i)
+                self._insert(key, signature, buckets)
+            firsts.append(i)
+        return firsts
+
+    def _remove(self, key):
+        # Caller holds the lock
+        signature = self._entries.pop(key)[0]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
@@ -0,0 +1,193 @@
+"""Calibrated confidence for TriageRules.
+
+The raw rule confidence is matched / total keywords of the winning category,
+so a single decisive keyword ("interview") scores about 0.09. RuleCalibration
+instead estimates, from labeled emails, how often each keyword is right when
+it fires in the subject and when it fires in the body. The confidence of a
+rule hit is the noisy-OR of the matched keywords' precisions: the probability
+that at least one of them is right.
+
+Precisions are shrunk toward the category's overall hit precision (and that
+toward the precision of all rule hits), so rare keywords get sensible values
+from little data. Counts rather than precisions are stored, so a calibration
+can be refitted on more data without losing anything.
+
+Run from src/:  python -m triage.rule_calibration --dataset ../data/golden_emails.json
+"""
+import argparse
+import hashlib
+import json
+import os
+
+DEFAULT_CALIBRATION_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "rule_calibration.json"
+)
+
+# Feature name for the "noreply" sender rule
+SENDER_RULE = "sender:noreply"
+
+
+class RuleCalibration:
+    """
+    Per-(keyword, position) hit counts fitted on labeled emails.
+
+    prior_strength: how many pseudo-observations of the category precision a
+    keyword starts with; higher values trust individual keywords less.
+    max_confidence keeps a calibrated score below 1.0 so that a threshold of
+    1.0 still sends everything to the LLM.
+    """
+
+    def __init__(self, counts=None, prior_strength=4.0, max_confidence=0.99):
+        # {label: {"hits": [correct, fired], "features": {"<position>:<keyword>": [correct, fired]}}}
+        self.counts = counts or {}
+        self.prior_strength = prior_strength
+        self.max_confidence = max_confidence
+
+    # --- fitting -------------------------------------------------------------
+
+    def _observe(self, label, features, correct):
+        entry = self.counts.setdefault(label, {"hits": [0, 0], "features": {}})
+        entry["hits"][0] += correct
+        entry["hits"][1] += 1
+        for feature in features:
+            pair = entry["features"].setdefault(feature, [0, 0])
+            pair[0] += correct
+            pair[1] += 1
+
+    def fit(self, rules, emails):
+        """
+        Add counts from labeled emails ({"subject", "body", "sender", "human_label"} or "label")
+        as classified by `rules` (a TriageRules). Returns the number of rule hits counted.
+        """
+        fitted = 0
+        for email in emails:
+            true_label = email.get("human_label") or email.get("label")
+            if not true_label:
+                continue
+            hit = rule_features(rules, email.get("subject", ""), email.get("body", ""), email.get("sender", ""))
+            if hit is None:
+                continue
+            label, features = hit
+            self._observe(label, features, int(true_label == label))
+            fitted += 1
+        return fitted
+
+    # --- scoring -------------------------------------------------------------
+
+    def _overall(self):
+        correct = sum(entry["hits"][0] for entry in self.counts.values())
+        fired = sum(entry["hits"][1] for entry in self.counts.values())
+        # No data at all: an uninformative 0.5
+        return (correct + 1.0) / (fired + 2.0)
+
+    def confidence(self, label, features):
+        """Calibrated probability that `label`, fired by `features`, is correct."""
+        overall = self._overall()
+        entry = self.counts.get(label)
+        if entry is None:
+            base = overall
+            feature_counts = {}
+        else:
+            correct, fired = entry["hits"]
+            base = (correct + self.prior_strength * overall) / (fired + self.prior_strength)
+            feature_counts = entry["features"]
+
+        miss = 1.0
+        for feature in features:
+            correct, fired = feature_counts.get(feature, (0, 0))
+            precision = (correct + self.prior_strength * base) / (fired + self.prior_strength)
+            miss *= 1.0 - precision
+        if not features:
+            miss = 1.0 - base
+        return round(min(1.0 - miss, self.max_confidence), 4)
+
+    # --- persistence ---------------------------------------------------------
+
+    def fingerprint(self):
+        raw = json.dumps({"counts": self.counts, "prior": self.prior_strength, "max": self.max_confidence}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def to_dict(self):
+        return {"version": 1, "prior_strength": self.prior_strength,
+                "max_confidence": self.max_confidence, "counts": self.counts}
+
+    def save(self, path=DEFAULT_CALIBRATION_PATH):
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CALIBRATION_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("counts"), data.get("prior_strength", 4.0), data.get("max_confidence", 0.99))
+
+
+def rule_features(rules, subject, body, sender=""):
+    """
+    (label, features) for the rule that fires on an email, or None if none does.
+    Features are "subject:<keyword>" or "body:<keyword>" (subject wins when a
+    keyword is in both), or SENDER_RULE.
+    """
+    subject_text = subject.lower()
+    hit = rules.matcher.match_keywords(f"{subject} {body}".lower())
+    if hit:
+        label, keywords, _ = hit
+        return label, [("subject:" if kw in subject_text else "body:") + kw for kw in keywords]
+    if "noreply" in sender.lower():
+        return "automated", [SENDER_RULE]
+    return None
+
+
+def load_default(path=DEFAULT_CALIBRATION_PATH):
+    """The calibration saved at `path`, or None if none has been fitted yet."""
+    if not os.path.exists(path):
+        return None
+    return RuleCalibration.load(path)
+
+
+def reliability(calibration, rules, emails, bins=10):
+    """[(bin low, bin high, hits, observed accuracy, mean confidence)] over labeled emails."""
+    table = [[0, 0, 0.0] for _ in range(bins)]
+    for email in emails:
+        true_label = email.get("human_label") or email.get("label")
+        hit = rule_features(rules, email.get("subject", ""), email.get("body", ""), email.get("sender", ""))
+        if not true_label or hit is None:
+            continue
+        label, features = hit
+        conf = calibration.confidence(label, features)
+        row = table[min(int(conf * bins), bins - 1)]
+        row[0] += 1
+        row[1] += int(label == true_label)
+        row[2] += conf
+    return [(i / bins, (i + 1) / bins, n, correct / n, total / n)
+            for i, (n, correct, total) in enumerate(table) if n]
+
+
+if __name__ == "__main__":
+    from triage.knn_tier import read_labeled
+    from triage.triage_rules import TriageRules
+
+    parser = argparse.ArgumentParser(description="Fit calibrated confidences for the triage rules on labeled emails")
+    parser.add_argument("--dataset", type=str, required=True, help="Labeled emails (.json array or .jsonl)")
+    parser.add_argument("--out", type=str, default=DEFAULT_CALIBRATION_PATH)
+    parser.add_argument("--prior-strength", type=float, default=4.0)
+    parser.add_argument("--update", action="store_true", help="Add to the counts already in --out instead of starting over")
+    args = parser.parse_args()
+
+    rules = TriageRules(calibration=False)
+    if args.update and os.path.exists(args.out):
+        calibration = RuleCalibration.load(args.out)
+    else:
+        calibration = RuleCalibration(prior_strength=args.prior_strength)
+    fitted = calibration.fit(rules, read_labeled(args.dataset))
+    calibration.save(args.out)
+    print(f"Fitted on {fitted} rule hits; saved to {args.out}")
+
+    print("\nConfidence bin   hits   accuracy   mean confidence")
+    for low, high, n, accuracy, mean in reliability(calibration, rules, read_labeled(args.dataset)):
+        print(f"{low:.1f}-{high:.1f}        {n:<6} {accuracy:<10.3f} {mean:.3f}")
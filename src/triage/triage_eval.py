@@ -1,13 +1,133 @@
 import json
 import os
-from collections import defaultdict
+import sys
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+
+# Run as `python triage_eval.py` from src/triage; make src/ importable for shared utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 from triage_rules import RuleBasedTriage
-from triage_llm import LLMFallbackTriage
+from triage_llm import LLMFallbackTriage, PROMPT_VERSION
+from eval_store import PredictionStore, email_input_hash
+from knn_tier import DEFAULT_INDEX_DIR, KnnTier
+from utils.export import open_exporter
+from utils.llm_gateway import LLMUnavailable
+
+# Map display names to underlying labels
+SUMMARY_MAP = {
+    "Spam": ["spam"],
+    "Promotion": ["promotion"],
+    "Finance": ["finance"],
+    "Action Intent": ["meeting"],
+    "Job Related": ["job_related"],
+    "Transactional": ["transactional"],
+    "Automated": ["automated"],
+    "Personal": ["personal"],
+    "Unknown": ["unknown", "uncertain"],
+}
+
+# Default thresholds for sweep(): 0.00, 0.05, ..., 1.00
+DEFAULT_SWEEP = tuple(round(i * 0.05, 2) for i in range(21))
+
+
+def iter_dataset(path, read_size=1 << 16):
+    """
+    Yield labeled emails one at a time without loading the whole file.
+
+    Supports JSONL (one object per line, by .jsonl extension) and a JSON array
+    of objects, which is decoded incrementally from fixed-size reads.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buf = ""
+        eof = False
+        # Skip to the opening bracket of the array
+        while "[" not in buf and not eof:
+            chunk = f.read(read_size)
+            eof = not chunk
+            buf += chunk
+        if "[" not in buf:
+            return
+        buf = buf[buf.index("[") + 1:]
+
+        while True:
+            buf = buf.lstrip(" \t\r\n,")
+            if buf.startswith("]"):
+                return
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buf += chunk
+                continue
+            yield obj
+            buf = buf[end:]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _score_chunk(classify, chunk, with_rows=False):
+    # Partial result for one chunk: (true, pred) counts merged by the caller, plus
+    # prediction rows (id, true, pred, correct) when they are being exported
+    confusion = Counter()
+    rows = [] if with_rows else None
+    for email in chunk:
+        predicted = classify(email)
+        confusion[(email["human_label"], predicted)] += 1
+        if with_rows:
+            rows.append([email.get("id"), email["human_label"], predicted, email["human_label"] == predicted])
+    return confusion, rows
+
+
+@contextmanager
+def _predictions_sheet(path):
+    # Per-email predictions streamed to `path` while evaluating; no-op without a path
+    if not path:
+        yield None
+        return
+    with open_exporter(path) as out:
+        yield out.sheet("Predictions", ["id", "human_label", "predicted_label", "correct"])
+
+
+_process_rules = None
+
+
+def _score_chunk_rules(chunk, with_rows=False):
+    # Process-pool worker: one RuleBasedTriage per process
+    global _process_rules
+    if _process_rules is None:
+        _process_rules = RuleBasedTriage()
+    return _score_chunk(
+        lambda e: _process_rules.classify(e["subject"], e["body"], e.get("sender", ""))["label"],
+        chunk,
+        with_rows
+    )
 
 
 class TriageEvaluator:
 
-    def __init__(self, golden_set_path=None, use_llm=False, llm_threshold=0.80):
+    def __init__(self, golden_set_path=None, use_llm=False, llm_threshold=0.80, knn=None):
         if golden_set_path is None:
             base_dir = os.path.dirname(os.path.abspath(__file__))
             self.golden_set_path = os.path.join(base_dir, "..", "..", "data", "golden_emails.json")
@@ -17,11 +137,26 @@ class TriageEvaluator:
         self.use_llm = use_llm
         self.llm_threshold = llm_threshold
         self.llm = LLMFallbackTriage() if use_llm else None
+        # Optional KnnTier consulted before the LLM for low-confidence emails
+        self.knn = knn
+        self.tier_stats = {"low_confidence": 0, "knn_answered": 0, "llm_calls": 0, "llm_unavailable": 0}
+        self._stats_lock = threading.Lock()
 
         # For confusion matrix and prediction counts
         self.confusion = defaultdict(lambda: defaultdict(int))
         self.pred_counts = defaultdict(int)
 
+    def fingerprint(self):
+        """Identifies everything that can change a prediction: rules, threshold, LLM model and prompt."""
+        parts = [self.rules.fingerprint(), f"llm={self.use_llm}"]
+        if self.use_llm:
+            parts += [f"threshold={self.llm_threshold}", self.llm.model_name, PROMPT_VERSION]
+        if self.knn is not None:
+            if not self.use_llm:
+                parts.append(f"threshold={self.llm_threshold}")
+            parts.append(self.knn.fingerprint())
+        return "|".join(parts)
+
     # Load golden dataset
     def load_dataset(self):
         with open(self.golden_set_path, "r", encoding="utf-8") as f:
@@ -38,114 +173,292 @@ class TriageEvaluator:
         label = rule_result["label"]
         conf = rule_result["confidence"]
 
-        # 2. If low confidence → fallback to LLM (optional)
-        if self.use_llm and conf < self.llm_threshold:
+        if conf >= self.llm_threshold:
+            return label
+        self._count("low_confidence")
+
+        # 2. If low confidence → nearest labeled examples (optional). Exact copies are
+        # skipped so emails the index was seeded from do not vote for themselves.
+        if self.knn is not None:
+            vote = self.knn.classify(subject, body, skip_exact=True)
+            if vote is not None:
+                self._count("knn_answered")
+                return vote["label"]
+
+        # 3. Still unsure → fallback to LLM (optional)
+        if self.use_llm:
+            self._count("llm_calls")
+            # Rate limits and transient errors are retried by the LLM gateway; other errors
+            # (bad key, bad request) are raised rather than scored as rule predictions
             try:
-                llm_result = self.llm.classify(subject, body)
-                label = llm_result["label"]
-            except Exception as e:
-                #rule label on LLM errors (e.g., rate limits)
-                label = label
+                label = self.llm.classify(subject, body)["label"]
+            except LLMUnavailable:
+                # Provider degraded: keep the rule label, but count it so the run shows it
+                self._count("llm_unavailable")
 
         return label
 
+    def _count(self, key):
+        with self._stats_lock:
+            self.tier_stats[key] += 1
+
+    def print_tier_stats(self):
+        """How many low-confidence emails the kNN tier answered instead of the LLM."""
+        stats = self.tier_stats
+        print(f"\nLow-confidence emails: {stats['low_confidence']}")
+        if self.knn is not None:
+            share = stats["knn_answered"] / stats["low_confidence"] if stats["low_confidence"] else 0.0
+            print(f"Answered by kNN tier ({len(self.knn)} examples): {stats['knn_answered']} "
+                  f"({share*100:.1f}% of LLM calls saved)")
+        if self.use_llm:
+            print(f"LLM calls: {stats['llm_calls']}")
+            if stats["llm_unavailable"]:
+                print(f"LLM unavailable, rule label kept: {stats['llm_unavailable']} "
+                      f"(accuracy understates the LLM tier)")
+
+    def sweep(self, thresholds=DEFAULT_SWEEP):
+        """
+        Accuracy against LLM-call rate for several rule-confidence thresholds, in one pass.
+
+        Each email is classified by the rules once; the fallback (kNN tier,
+        then LLM) runs once for emails below the highest threshold, and every
+        threshold is scored from those answers. Without use_llm no LLM is
+        called and "accuracy" assumes every LLM call would have been answered
+        correctly, i.e. it is an upper bound. Returns one dict per threshold.
+        """
+        thresholds = sorted(set(thresholds))
+        counts = {t: Counter() for t in thresholds}
+        total = 0
+
+        for email in iter_dataset(self.golden_set_path):
+            subject, body, truth = email["subject"], email["body"], email["human_label"]
+            rule = self.rules.classify(subject, body, email.get("sender", ""))
+            rule_correct = rule["label"] == truth
+            total += 1
+
+            via, fallback_correct = None, False
+            if rule["confidence"] < thresholds[-1]:
+                vote = self.knn.classify(subject, body, skip_exact=True) if self.knn is not None else None
+                if vote is not None:
+                    via, fallback_correct = "knn", vote["label"] == truth
+                elif self.use_llm:
+                    try:
+                        label = self.llm.classify(subject, body)["label"]
+                    except LLMUnavailable:
+                        self._count("llm_unavailable")
+                        label = rule["label"]
+                    via, fallback_correct = "llm", label == truth
+                else:
+                    via, fallback_correct = "llm", True
+
+            for t in thresholds:
+                c = counts[t]
+                if rule["confidence"] >= t:
+                    c["rules"] += 1
+                    c["rules_correct"] += rule_correct
+                    c["correct"] += rule_correct
+                else:
+                    c[via] += 1
+                    c["correct"] += fallback_correct
+
+        rows = []
+        for t in thresholds:
+            c = counts[t]
+            rows.append({
+                "threshold": t,
+                "rules_kept": c["rules"],
+                "knn_answered": c["knn"],
+                "llm_calls": c["llm"],
+                "llm_call_rate": round(c["llm"] / total, 4) if total else 0.0,
+                "rules_accuracy": round(c["rules_correct"] / c["rules"], 4) if c["rules"] else None,
+                "accuracy": round(c["correct"] / total, 4) if total else 0.0,
+            })
+        return rows
+
+    def print_sweep(self, rows):
+        print("\nThreshold sweep" + ("" if self.use_llm else " (accuracy assumes LLM answers are correct)") + ":")
+        print("{:<11}{:<12}{:<12}{:<11}{:<15}{:<16}{:<10}".format(
+            "threshold", "rules_kept", "knn", "llm_calls", "llm_call_rate", "rules_accuracy", "accuracy"))
+        for row in rows:
+            rules_accuracy = "-" if row["rules_accuracy"] is None else f"{row['rules_accuracy']*100:.2f}%"
+            print("{:<11}{:<12}{:<12}{:<11}{:<15}{:<16}{:<10}".format(
+                f"{row['threshold']:.2f}", row["rules_kept"], row["knn_answered"], row["llm_calls"],
+                f"{row['llm_call_rate']*100:.1f}%", rules_accuracy, f"{row['accuracy']*100:.2f}%"))
+
+    def export_sweep(self, rows, output_path):
+        """Write sweep() rows to .xlsx, .csv, .jsonl or .parquet."""
+        columns = ["threshold", "rules_kept", "knn_answered", "llm_calls", "llm_call_rate", "rules_accuracy", "accuracy"]
+        with open_exporter(output_path) as out:
+            sheet = out.sheet("ThresholdSweep", columns)
+            for row in rows:
+                sheet.write([row[c] for c in columns])
+
     # Full evaluation
-    def evaluate(self):
+    def evaluate(self, predictions_path=None):
         dataset = self.load_dataset()
         correct = 0
         total = len(dataset)
 
         print("Evaluating triage system...\n")
 
-        for email in dataset:
-            human_label = email["human_label"]
-            predicted_label = self.classify_email(email)
+        with _predictions_sheet(predictions_path) as predictions:
+            for email in dataset:
+                human_label = email["human_label"]
+                predicted_label = self.classify_email(email)
 
-            # Update confusion matrix
-            self.confusion[human_label][predicted_label] += 1
-            # Update prediction counts
-            self.pred_counts[predicted_label] += 1
+                # Update confusion matrix
+                self.confusion[human_label][predicted_label] += 1
+                # Update prediction counts
+                self.pred_counts[predicted_label] += 1
 
-            if human_label == predicted_label:
-                correct += 1
+                if human_label == predicted_label:
+                    correct += 1
+
+                if predictions is not None:
+                    predictions.write([email.get("id"), human_label, predicted_label, human_label == predicted_label])
 
         accuracy = correct / total
 
         return accuracy
 
-    def export_excel(self, accuracy: float, output_path: str):
-        """Export summary counts and accuracy to an Excel file.
+    def evaluate_incremental(self, store=None, chunk_size=500, predictions_path=None):
+        """
+        Evaluate, reusing stored predictions where nothing relevant changed.
 
-        Includes:
-        - Summary sheet with counts for key categories
-        - Confusion matrix sheet with full breakdown
+        An email is reclassified only if its subject/body/sender changed or the
+        classifier fingerprint (rules, threshold, LLM model/prompt) differs from
+        the run that stored its prediction. Confusion matrix and counts are
+        filled exactly as evaluate() does. Returns accuracy; reused/recomputed
+        counts are left in self.incremental_stats.
         """
-        try:
-            from openpyxl import Workbook
-        except ImportError:
-            raise ImportError("openpyxl is not installed. Please add it to requirements or install it.")
-
-        # Map display names to underlying labels
-        summary_map = {
-            "Spam": ["spam"],
-            "Promotion": ["promotion"],
-            "Finance": ["finance"],
-            "Action Intent": ["meeting"],
-            "Job Related": ["job_related"],
-            "Transactional": ["transactional"],
-            "Automated": ["automated"],
-            "Personal": ["personal"],
-            "Unknown": ["unknown", "uncertain"],
-        }
-
-        wb = Workbook()
-
-        # Summary sheet
-        ws_summary = wb.active
-        ws_summary.title = "Summary"
-        ws_summary.append(["Category", "Count"])
-        for display, labels in summary_map.items():
-            count = sum(self.pred_counts.get(lbl, 0) for lbl in labels)
-            ws_summary.append([display, count])
-        ws_summary.append([])
-        ws_summary.append(["Final Accuracy", f"{accuracy*100:.2f}%"])
+        store = store or PredictionStore()
+        fingerprint = self.fingerprint()
+        correct = total = reused = 0
+        stale_rows = []
 
-        # Confusion Matrix sheet
-        ws_cm = wb.create_sheet("ConfusionMatrix")
-        labels = sorted(set(self.confusion.keys()) |
-                        {pred for true in self.confusion.values() for pred in true})
+        print("Evaluating triage system...\n")
 
-        # Header row
-        ws_cm.append(["True \\ Pred"] + labels)
-        for true_label in labels:
-            row = [true_label]
-            for pred_label in labels:
-                row.append(self.confusion[true_label][pred_label])
-            ws_cm.append(row)
+        with _predictions_sheet(predictions_path) as predictions:
+            for chunk in _chunks(iter_dataset(self.golden_set_path), chunk_size):
+                hashes = [email_input_hash(email) for email in chunk]
+                keys = [str(email["id"]) if "id" in email else h for email, h in zip(chunk, hashes)]
+                stored = store.lookup(set(keys))
+
+                for email, key, input_hash in zip(chunk, keys, hashes):
+                    previous = stored.get(key)
+                    if previous is not None and previous[:2] == (input_hash, fingerprint):
+                        predicted_label = previous[2]
+                        reused += 1
+                    else:
+                        predicted_label = self.classify_email(email)
+                        stale_rows.append((key, input_hash, fingerprint, predicted_label))
+
+                    human_label = email["human_label"]
+                    self.confusion[human_label][predicted_label] += 1
+                    self.pred_counts[predicted_label] += 1
+                    total += 1
+                    if human_label == predicted_label:
+                        correct += 1
+
+                    if predictions is not None:
+                        predictions.write([email.get("id"), human_label, predicted_label, human_label == predicted_label])
+
+                if stale_rows:
+                    store.save(stale_rows)
+                    stale_rows = []
+
+        self.incremental_stats = {"reused": reused, "recomputed": total - reused}
+        return correct / total if total else 0.0
+
+    def evaluate_stream(self, workers=4, pool=None, chunk_size=256, predictions_path=None):
+        """
+        Evaluate a large golden set (JSON or JSONL) with flat memory use.
+
+        Emails are streamed from disk in chunks and classified in parallel:
+        pool="thread" overlaps LLM round-trips, pool="process" spreads rule
+        matching over CPU cores (rules only). By default threads are used when
+        the LLM is enabled. Each worker returns a partial confusion matrix that
+        is merged here; at most 2 * workers chunks are in flight at once.
+        With predictions_path, per-email predictions are streamed to it as
+        chunks finish (so rows follow completion order, not input order).
+        """
+        pool = pool or ("thread" if self.use_llm or self.knn is not None else "process")
+        if pool == "process" and (self.use_llm or self.knn is not None):
+            raise ValueError("pool='process' evaluates rules only; use pool='thread' with use_llm or knn")
+
+        if pool == "process":
+            executor = ProcessPoolExecutor(max_workers=workers)
+            score = _score_chunk_rules
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            score = lambda chunk, with_rows: _score_chunk(self.classify_email, chunk, with_rows)
+
+        print("Evaluating triage system...\n")
+
+        merged = Counter()
+        with executor, _predictions_sheet(predictions_path) as predictions:
+            def collect(future):
+                confusion, rows = future.result()
+                merged.update(confusion)
+                for row in rows or ():
+                    predictions.write(row)
+
+            in_flight = set()
+            for chunk in _chunks(iter_dataset(self.golden_set_path), chunk_size):
+                in_flight.add(executor.submit(score, chunk, predictions is not None))
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+            for future in in_flight:
+                collect(future)
+
+        correct = total = 0
+        for (human_label, predicted_label), count in merged.items():
+            self.confusion[human_label][predicted_label] += count
+            self.pred_counts[predicted_label] += count
+            total += count
+            if human_label == predicted_label:
+                correct += count
 
-        # Ensure directory exists
-        out_dir = os.path.dirname(output_path)
-        if out_dir and not os.path.exists(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
+        return correct / total if total else 0.0
 
-        wb.save(output_path)
+    def export(self, accuracy: float, output_path: str):
+        """Export summary counts, accuracy and the confusion matrix.
+
+        The format follows the extension (.xlsx, .csv, .jsonl or .parquet); rows
+        are streamed to disk rather than built up in an in-memory workbook.
+        Includes:
+        - Summary sheet with counts for key categories
+        - Confusion matrix sheet with full breakdown
+        """
+        with open_exporter(output_path) as out:
+            # Summary sheet
+            summary = out.sheet("Summary", ["Category", "Count"])
+            for display, labels in SUMMARY_MAP.items():
+                count = sum(self.pred_counts.get(lbl, 0) for lbl in labels)
+                summary.write([display, count])
+            summary.write([])
+            summary.write(["Final Accuracy", f"{accuracy*100:.2f}%"])
+
+            # Confusion Matrix sheet
+            labels = sorted(set(self.confusion.keys()) |
+                            {pred for true in self.confusion.values() for pred in true})
+            cm = out.sheet("ConfusionMatrix", ["True \\ Pred"] + labels)
+            for true_label in labels:
+                row = [true_label]
+                for pred_label in labels:
+                    row.append(self.confusion[true_label][pred_label])
+                cm.write(row)
+
+    def export_excel(self, accuracy: float, output_path: str):
+        """Export summary counts and accuracy to an Excel file (see export())."""
+        self.export(accuracy, output_path)
 
     def print_summary_counts(self, accuracy: float):
         """Print category counts and final accuracy to the terminal."""
-        summary_map = {
-            "Spam": ["spam"],
-            "Promotion": ["promotion"],
-            "Finance": ["finance"],
-            "Action Intent": ["meeting"],
-            "Job Related": ["job_related"],
-            "Transactional": ["transactional"],
-            "Automated": ["automated"],
-            "Personal": ["personal"],
-            "Unknown": ["unknown", "uncertain"],
-        }
-
         print("\nSummary Counts:")
-        for display, labels in summary_map.items():
+        for display, labels in SUMMARY_MAP.items():
             count = sum(self.pred_counts.get(lbl, 0) for lbl in labels)
             print(f"{display}: {count}")
         print(f"\nFinal Accuracy: {accuracy*100:.2f}%")
@@ -179,29 +492,55 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Evaluate the triage system")
     parser.add_argument("--use-llm", action="store_true", help="Enable LLM fallback during evaluation")
     parser.add_argument("--llm-threshold", type=float, default=0.80, help="Confidence threshold to trigger LLM fallback")
+    parser.add_argument("--dataset", type=str, default=None, help="Golden set path (.json array or .jsonl)")
+    parser.add_argument("--workers", type=int, default=0, help="Stream the dataset and classify with N parallel workers")
+    parser.add_argument("--pool", choices=["thread", "process"], default=None, help="Worker pool for --workers (default: thread with LLM, process without)")
+    parser.add_argument("--predictions", type=str, default=None, help="Stream per-email predictions to this file (.xlsx, .csv, .jsonl or .parquet)")
+    parser.add_argument("--incremental", action="store_true", help="Reuse stored predictions; only reclassify emails whose input or classifier changed")
+    parser.add_argument("--knn", nargs="?", const=DEFAULT_INDEX_DIR, default=None, help="Consult the kNN index (default data/knn_index) before the LLM")
+    parser.add_argument("--sweep", nargs="?", const=",".join(str(t) for t in DEFAULT_SWEEP), default=None,
+                        help="Report accuracy vs LLM-call rate per threshold (comma-separated; default 0.00-1.00 in 0.05 steps)")
+    parser.add_argument("--sweep-out", type=str, default=None, help="Also write the sweep table here (.xlsx, .csv, .jsonl or .parquet)")
     args = parser.parse_args()
 
-    evaluator = TriageEvaluator(use_llm=args.use_llm, llm_threshold=args.llm_threshold)
-    accuracy = evaluator.evaluate()
+    knn = KnnTier(args.knn) if args.knn else None
+    evaluator = TriageEvaluator(golden_set_path=args.dataset, use_llm=args.use_llm, llm_threshold=args.llm_threshold, knn=knn)
+    if args.sweep:
+        rows = evaluator.sweep([float(t) for t in args.sweep.split(",") if t.strip()])
+        evaluator.print_sweep(rows)
+        if args.sweep_out:
+            evaluator.export_sweep(rows, args.sweep_out)
+            print(f"\nSweep saved to: {args.sweep_out}")
+        sys.exit(0)
+    if args.incremental:
+        accuracy = evaluator.evaluate_incremental(predictions_path=args.predictions)
+        stats = evaluator.incremental_stats
+        print(f"Reused {stats['reused']} stored predictions, recomputed {stats['recomputed']}")
+    elif args.workers > 0:
+        accuracy = evaluator.evaluate_stream(workers=args.workers, pool=args.pool, predictions_path=args.predictions)
+    else:
+        accuracy = evaluator.evaluate(predictions_path=args.predictions)
 
     print(f"\nInitial Accuracy: {accuracy*100:.2f}%")
 
     evaluator.print_confusion_matrix()
     evaluator.print_summary_counts(accuracy)
+    if args.knn or args.use_llm:
+        evaluator.print_tier_stats()
     # Always interactive prompt for Excel export
     try:
         default_out = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "triage_results.xlsx")
         choice = input("\nExport results to Excel? (y=save to default, c=choose path, N=skip) [y/N/c]: ").strip().lower()
         if choice in ("y", "yes"):
             out_path = default_out
-            evaluator.export_excel(accuracy, out_path)
+            evaluator.export(accuracy, out_path)
             print(f"\nExcel results saved to: {out_path}")
         elif choice in ("c", "choose", "custom"):
-            out_path = input(f"Enter Excel output path [{default_out}]: ").strip()
+            out_path = input(f"Enter output path (.xlsx, .csv, .jsonl or .parquet) [{default_out}]: ").strip()
             if not out_path:
                 out_path = default_out
-            evaluator.export_excel(accuracy, out_path)
-            print(f"\nExcel results saved to: {out_path}")
+            evaluator.export(accuracy, out_path)
+            print(f"\nResults saved to: {out_path}")
         else:
             print("\nSkipping Excel export.")
     except Exception as e:
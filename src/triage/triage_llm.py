@@ -1,31 +1,22 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
+import asyncio
+import json
 import os
+from utils.config import load_env
+from utils.llm_clients import get_chat_model
+from utils.llm_gateway import get_gateway
+from triage.llm_cache import ClassificationCache, DEFAULT_CACHE_PATH, cache_key
+from utils.metrics import METRICS
+import time
 
+# Bump when the prompt below changes so cached classifications are not reused
+PROMPT_VERSION = "v1"
 
-class LLMFallbackTriage:
-
-    def __init__(self):
-        # Load .env so OPENAI_API_KEY is available if not set in system env
-        load_dotenv()
-        self.model = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+METRICS.describe("llm_requests_total", "Triage LLM requests sent, by mode (single, async, packed)")
+METRICS.describe("llm_parse_failures_total", "LLM answers that could not be parsed and fell back to unknown")
+METRICS.describe("llm_cache_hits_total", "Triage classifications served from the LLM cache")
+METRICS.describe("llm_request_seconds", "Triage LLM request latency")
 
-        # The categories we allow
-        self.allowed_labels = [
-            "spam", "promotion", "finance", "meeting",
-            "job_related", "transactional", "automated",
-            "personal", "unknown"
-        ]
-
-
-    def classify(self, subject, body):   #Returns { label, confidence, source }
- 
-        prompt = ChatPromptTemplate.from_template("""
+PROMPT_TEMPLATE = """
 You are an email classifier. Read the email and respond ONLY in JSON.
 
 Email subject: {subject}
@@ -49,39 +40,277 @@ Return JSON in this EXACT format:
 }}
 
 Think step-by-step internally but ONLY output JSON.
-""")
+"""
 
-        chain = prompt | self.model
+# Several emails in one request. Same categories and output contract as PROMPT_TEMPLATE,
+# so results share the cache with single-email classifications.
+PACKED_PROMPT_TEMPLATE = """
+You are an email classifier. Classify EACH email in the JSON array below.
 
-        llm_response = chain.invoke({
-            "subject": subject,
-            "body": body
-        })
+Emails:
+{emails}
+
+Categories: spam, promotion, finance, meeting, job_related, transactional, automated, personal, unknown
+
+Return ONLY a JSON array with one object per email, in this EXACT format:
+[
+    {{"id": email_id, "label": "one_of_the_categories", "confidence": number_between_0_and_1}}
+]
+"""
+
+# Rough prompt size estimate; ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+PACKED_PROMPT_OVERHEAD_TOKENS = 120
+PER_EMAIL_OVERHEAD_TOKENS = 20
+
+_prompts = {}
+
+
+def _is_number(value):
+    # JSON true/false load as bools, which are ints to isinstance
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _prompt(template):
+    # Built on first use so that importing this module does not load langchain_core
+    prompt = _prompts.get(template)
+    if prompt is None:
+        from langchain_core.prompts import ChatPromptTemplate
+        prompt = _prompts[template] = ChatPromptTemplate.from_template(template)
+    return prompt
+
+
+class LLMFallbackTriage:
+
+    def __init__(self, cache=None, max_concurrency=16, timeout=30.0, pack_token_budget=3000):
+        # Load .env so OPENAI_API_KEY is available if not set in system env
+        load_env()
+        # Shared client from the registry, reused across instances and emails
+        self.model_name = "gpt-4o-mini"
+        self.model = get_chat_model(
+            model=self.model_name,
+            temperature=0,
+            api_key=os.getenv("OPENAI_API_KEY")
+        )
+
+        # The categories we allow
+        self.allowed_labels = [
+            "spam", "promotion", "finance", "meeting",
+            "job_related", "transactional", "automated",
+            "personal", "unknown"
+        ]
+
+        # cache=None -> default on-disk cache, cache=False -> no caching
+        if cache is None:
+            cache = ClassificationCache(path=os.getenv("TRIAGE_LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.cache = cache or None
+
+        # Async path: at most `max_concurrency` requests in flight, each capped at `timeout` seconds
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        # Packed mode: max estimated prompt tokens per multi-email request
+        self.pack_token_budget = pack_token_budget
+
+    def _from_cache(self, subject, body):
+        # Returns (key, cached result or None); key is None when caching is off
+        if self.cache is None:
+            return None, None
+        key = cache_key(subject, body, self.model_name, PROMPT_VERSION)
+        cached = self.cache.get(key)
+        if cached is None:
+            return key, None
+        METRICS.inc("llm_cache_hits_total")
+        return key, {
+            "label": cached["label"],
+            "confidence": cached["confidence"],
+            "source": "llm"
+        }
+
+    def _parse(self, key, content):
 
-        # Parse JSON safely
+        # Parse JSON safely; the model output is never evaluated as code
+        parsed = True
         try:
-            result = eval(llm_response.content)
-        except:
+            content = content.strip()
+            # Tolerate ```json fences around the object
+            result = json.loads(content[content.index("{"):content.rindex("}") + 1])
+            if not isinstance(result, dict):
+                raise TypeError(f"expected a JSON object, got {type(result).__name__}")
+            label = result["label"]
+            if not isinstance(label, str):
+                raise TypeError(f"label is not a string: {label!r}")
+            conf = result.get("confidence", 0.5)
+            if not _is_number(conf):
+                raise TypeError(f"confidence is not a number: {conf!r}")
+        except (ValueError, KeyError, TypeError, AttributeError):
             # If LLM fails → default fallback
-            result = {
-                "label": "unknown",
-                "confidence": 0.50
-            }
+            parsed = False
+            METRICS.inc("llm_parse_failures_total")
+            label, conf = "unknown", 0.50
 
         # Ensure valid label
-        if result["label"] not in self.allowed_labels:
-            result["label"] = "unknown"
+        if label not in self.allowed_labels:
+            label = "unknown"
 
         # Ensure confidence is in range
-        conf = result.get("confidence", 0.5)
-        conf = max(0, min(conf, 1))  
+        conf = max(0, min(conf, 1))
+
+        # Only real answers are cached; a parse failure should be retried next time
+        if key is not None and parsed:
+            self.cache.put(key, label, conf)
 
         return {
-            "label": result["label"],
+            "label": label,
             "confidence": conf,
             "source": "llm"
         }
 
+    def classify(self, subject, body):   #Returns { label, confidence, source }
+
+        key, cached = self._from_cache(subject, body)
+        if cached is not None:
+            return cached
+
+        chain = _prompt(PROMPT_TEMPLATE) | self.model
+
+        # Rate-limited and retried by the shared gateway; raises LLMUnavailable while the provider is degraded
+        start = time.perf_counter()
+        llm_response = get_gateway().invoke(chain, {
+            "subject": subject,
+            "body": body
+        }, tokens=self._estimate_tokens(subject, body))
+        METRICS.inc("llm_requests_total", {"mode": "single"})
+        METRICS.observe("llm_request_seconds", time.perf_counter() - start, {"mode": "single"})
+
+        return self._parse(key, llm_response.content)
+
+    async def aclassify(self, subject, body):
+        """
+        Async classify(). Calls share one semaphore, so any number of them can be
+        awaited together while only `max_concurrency` hit the API at once.
+        Raises asyncio.TimeoutError if the model takes longer than `timeout`
+        (gateway waits and retries included), LLMUnavailable while the
+        provider is degraded.
+        """
+        key, cached = self._from_cache(subject, body)
+        if cached is not None:
+            return cached
+
+        # A semaphore belongs to one event loop; make a new one if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+
+        chain = _prompt(PROMPT_TEMPLATE) | self.model
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            llm_response = await asyncio.wait_for(
+                get_gateway().ainvoke(chain, {"subject": subject, "body": body},
+                                      tokens=self._estimate_tokens(subject, body)),
+                timeout=self.timeout
+            )
+            METRICS.inc("llm_requests_total", {"mode": "async"})
+            METRICS.observe("llm_request_seconds", time.perf_counter() - start, {"mode": "async"})
+
+        return self._parse(key, llm_response.content)
+
+
+    def _estimate_tokens(self, subject, body):
+        return (len(subject) + len(body)) // CHARS_PER_TOKEN + PER_EMAIL_OVERHEAD_TOKENS
+
+    def _packs(self, items):
+        # Greedy packing of (index, subject, body) under the token budget
+        budget = self.pack_token_budget - PACKED_PROMPT_OVERHEAD_TOKENS
+        pack, used = [], 0
+        for item in items:
+            cost = self._estimate_tokens(item[1], item[2])
+            if pack and used + cost > budget:
+                yield pack
+                pack, used = [], 0
+            pack.append(item)
+            used += cost
+        if pack:
+            yield pack
+
+    def _classify_pack(self, pack):
+        """Send one packed request; return {index: result} for the items that parsed."""
+        emails = json.dumps(
+            [{"id": i, "subject": subject, "body": body} for i, subject, body in pack],
+            ensure_ascii=False
+        )
+        start = time.perf_counter()
+        tokens = PACKED_PROMPT_OVERHEAD_TOKENS + sum(self._estimate_tokens(subject, body) for _, subject, body in pack)
+        llm_response = get_gateway().invoke(_prompt(PACKED_PROMPT_TEMPLATE) | self.model, {"emails": emails}, tokens=tokens)
+        METRICS.inc("llm_requests_total", {"mode": "packed"})
+        METRICS.observe("llm_request_seconds", time.perf_counter() - start, {"mode": "packed"})
+
+        try:
+            content = llm_response.content.strip()
+            # Tolerate ```json fences around the array
+            content = content[content.index("["):content.rindex("]") + 1]
+            answers = json.loads(content)
+        except ValueError:
+            METRICS.inc("llm_parse_failures_total")
+            return {}
+
+        wanted = {i: (subject, body) for i, subject, body in pack}
+        results = {}
+        for answer in answers if isinstance(answers, list) else []:
+            if not isinstance(answer, dict) or not _is_number(answer.get("id")) or answer["id"] not in wanted:
+                continue
+            label = answer.get("label")
+            conf = answer.get("confidence")
+            if label not in self.allowed_labels or not _is_number(conf):
+                continue
+            conf = max(0, min(conf, 1))
+            results[answer["id"]] = {"label": label, "confidence": conf, "source": "llm"}
+            if self.cache is not None:
+                subject, body = wanted[answer["id"]]
+                self.cache.put(cache_key(subject, body, self.model_name, PROMPT_VERSION), label, conf)
+        return results
+
+    def classify_many(self, emails, max_rounds=2):
+        """
+        Classify many emails with as few requests as possible.
+
+        emails: iterable of (subject, body). Cached emails are answered directly;
+        the rest are packed into requests of at most `pack_token_budget`
+        estimated tokens. Items missing or invalid in a packed answer are
+        re-packed for up to `max_rounds` rounds, then classified one by one.
+        Returns results in input order, in the same shape as classify().
+        Raises LLMUnavailable if the provider is degraded; answers received
+        before that are in the cache.
+        """
+        emails = list(emails)
+        results = [None] * len(emails)
+        pending = []
+        for i, (subject, body) in enumerate(emails):
+            _, cached = self._from_cache(subject, body)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, subject, body))
+
+        for _ in range(max_rounds):
+            if len(pending) < 2:
+                break
+            for pack in self._packs(pending):
+                if len(pack) == 1:
+                    continue
+                for i, result in self._classify_pack(pack).items():
+                    results[i] = result
+            pending = [item for item in pending if results[item[0]] is None]
+
+        for i, subject, body in pending:
+            results[i] = self.classify(subject, body)
+
+        return results
+
 
 if __name__ == "__main__":
     triage = LLMFallbackTriage()
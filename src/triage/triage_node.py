@@ -1,17 +1,74 @@
 from triage.triage_rules import RuleBasedTriage
-from triage.triage_llm import LLMFallbackTriage
-from langsmith import trace
+from triage.near_duplicate import NearDuplicateIndex
+from triage import knn_tier
 from typing import Dict, Any
+from utils.llm_gateway import LLMUnavailable
+from utils.metrics import METRICS
+import asyncio
+import time
+
+METRICS.describe("triage_emails_total", "Emails triaged, by deciding source (rules, near_duplicate, knn or llm)")
+METRICS.describe("triage_labels_total", "Final triage labels")
+METRICS.describe("triage_stage_seconds", "Per-stage triage latency (rules, near_duplicate, knn, llm, total)")
+METRICS.describe("llm_timeouts_total", "Async triage LLM calls that timed out and fell back to the rule label")
+METRICS.describe("triage_llm_unavailable_total", "Low-confidence emails given the rule label because the LLM provider was degraded")
+
+
+def triage_metrics():
+    """JSON snapshot of triage metrics plus derived fallback, near-duplicate, LLM parse-failure and LLM-unavailable rates and LLM timeouts."""
+    snapshot = METRICS.snapshot()
+    emails = METRICS.counter_total("triage_emails_total")
+    llm_routed = METRICS.counter_value("triage_emails_total", {"source": "llm"})
+    reused = METRICS.counter_value("triage_emails_total", {"source": "near_duplicate"})
+    knn_answered = METRICS.counter_value("triage_emails_total", {"source": "knn"})
+    llm_calls = METRICS.counter_total("llm_requests_total")
+    parse_failures = METRICS.counter_total("llm_parse_failures_total")
+    snapshot["rates"] = {
+        "fallback_rate": round(llm_routed / emails, 4) if emails else 0.0,
+        # Emails that would have gone to the LLM but reused a near-duplicate's label
+        "near_duplicate_rate": round(reused / emails, 4) if emails else 0.0,
+        "knn_rate": round(knn_answered / emails, 4) if emails else 0.0,
+        "llm_classifications_skipped": reused + knn_answered,
+        "llm_parse_failure_rate": round(parse_failures / llm_calls, 4) if llm_calls else 0.0,
+        "llm_timeouts": METRICS.counter_total("llm_timeouts_total"),
+        "llm_unavailable_rate": round(METRICS.counter_total("triage_llm_unavailable_total") / emails, 4) if emails else 0.0,
+    }
+    return snapshot
+
 
 class TriageNode:
 
-    def __init__(self, threshold=0.80):
+    def __init__(self, threshold=0.80, near_duplicates=True, knn=False):
   
         #threshold: minimum confidence score to trust rules
+        #near_duplicates: True for a default NearDuplicateIndex, an index to share one, or None to turn it off
+        #knn: off by default; True for the index in data/knn_index if one was built, or a KnnTier
    
         self.threshold = threshold
         self.rules = RuleBasedTriage()
-        self.llm = LLMFallbackTriage()
+        self._llm = None
+        if near_duplicates is True:
+            near_duplicates = NearDuplicateIndex()
+        elif near_duplicates is False:
+            near_duplicates = None
+        self.near_duplicates = near_duplicates
+        if knn is True:
+            knn = knn_tier.open_default()
+        elif knn is False:
+            knn = None
+        self.knn = knn
+
+    @property
+    def llm(self):
+        # Created on the first fallback, so rules-only triage never imports the LLM stack
+        if self._llm is None:
+            from triage.triage_llm import LLMFallbackTriage
+            self._llm = LLMFallbackTriage()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
 
     # LangGraph calls this method
     def run(self, email):
@@ -27,36 +84,265 @@ class TriageNode:
         {
             "final_label": "...",
             "final_confidence": 0.xx,
-            "source": "rules" or "llm"
+            "source": "rules", "near_duplicate", "knn" or "llm"
         }
+
+        Emails the rules are not sure about are first looked up among recent
+        LLM-classified emails; a near-duplicate (another copy of the same
+        campaign) reuses that label instead of calling the LLM. Next, a
+        confident vote of the nearest labeled examples in the kNN index
+        answers without the LLM. While the LLM provider is degraded (see
+        utils.llm_gateway) the rule result is returned instead.
         """
 
         subject = email.get("subject", "")
         body = email.get("body", "")
         sender = email.get("sender", "")
+        start = time.perf_counter()
 
         # 1️Run rule-based triage
         rule_result = self.rules.classify(subject, body, sender)
         rule_label = rule_result["label"]
         rule_conf = rule_result["confidence"]
+        rules_done = time.perf_counter()
+        METRICS.observe("triage_stage_seconds", rules_done - start, {"stage": "rules"})
 
         # If rules are confident → use them
         if rule_conf >= self.threshold:
-            return {
+            return self._record({
                 "final_label": rule_label,
                 "final_confidence": rule_conf,
                 "source": "rules"
-            }
+            }, start)
+
+        # Seen a near-duplicate of this one → reuse its label
+        signature, reused = self._near_duplicate(subject, body)
+        if reused is not None:
+            return self._record(reused, start)
+
+        # Close to labeled examples → use their vote
+        voted = self._knn([(subject, body)])[0]
+        if voted is not None:
+            return self._record(voted, start)
 
         # Else → Fallback to LLM
-        llm_result = self.llm.classify(subject, body)
+        llm_started = time.perf_counter()
+        try:
+            llm_result = self.llm.classify(subject, body)
+        except LLMUnavailable:
+            return self._record(self._degraded(rule_result), start)
+        METRICS.observe("triage_stage_seconds", time.perf_counter() - llm_started, {"stage": "llm"})
+        self._remember(signature, llm_result)
 
-        return {
+        return self._record({
             "final_label": llm_result["label"],
             "final_confidence": llm_result["confidence"],
             "source": "llm"
+        }, start)
+
+    def _near_duplicate(self, subject, body):
+        # (signature, reused result or None); (None, None) when the index is off
+        if self.near_duplicates is None:
+            return None, None
+        started = time.perf_counter()
+        signature = self.near_duplicates.signature(subject, body)
+        match = self.near_duplicates.lookup(signature)
+        METRICS.observe("triage_stage_seconds", time.perf_counter() - started, {"stage": "near_duplicate"})
+        if match is None:
+            return signature, None
+        return signature, {
+            "final_label": match["label"],
+            "final_confidence": match["confidence"],
+            "source": "near_duplicate"
+        }
+
+    def _knn(self, emails):
+        # kNN tier results for (subject, body) pairs, None where it abstains or is off
+        if self.knn is None or not emails:
+            return [None] * len(emails)
+        started = time.perf_counter()
+        votes = self.knn.classify_many(emails)
+        METRICS.observe("triage_stage_seconds", (time.perf_counter() - started) / len(emails), {"stage": "knn"})
+        return [None if vote is None else {
+            "final_label": vote["label"],
+            "final_confidence": vote["confidence"],
+            "source": "knn"
+        } for vote in votes]
+
+    def _degraded(self, rule_result):
+        # Rules-only answer for an email the LLM should have classified
+        METRICS.inc("triage_llm_unavailable_total")
+        return {
+            "final_label": rule_result["label"],
+            "final_confidence": rule_result["confidence"],
+            "source": "rules"
         }
+
+    def _remember(self, signature, llm_result):
+        # Parse failures ("unknown") are not worth copying to near-duplicates
+        if signature is not None and llm_result["label"] != "unknown":
+            self.near_duplicates.add(signature, {"label": llm_result["label"], "confidence": llm_result["confidence"]})
+
+    def _record(self, result, start=None):
+        # Routing, label and end-to-end latency metrics for one triaged email
+        METRICS.inc("triage_emails_total", {"source": result["source"]})
+        METRICS.inc("triage_labels_total", {"label": result["final_label"]})
+        if start is not None:
+            METRICS.observe("triage_stage_seconds", time.perf_counter() - start, {"stage": "total"})
+        return result
     
+    def run_batch(self, emails):
+        """
+        Classify many emails in one call.
+
+        Rules run over the whole batch first; only the emails the rules are
+        not confident about are sent to the LLM, minus near-duplicates of
+        recently classified emails, all but one copy of each near-duplicate
+        group within the batch, and emails the kNN tier answers (searched in
+        one call). Results are returned in input order, in the same shape as
+        run(). If the LLM provider is degraded, the emails still waiting for
+        it get their rule results.
+        """
+        emails = list(emails)
+        start = time.perf_counter()
+        rule_results = self.rules.classify_batch(emails)
+        rules_done = time.perf_counter()
+        # Batch stages are observed once per batch, as the per-email average
+        if emails:
+            METRICS.observe("triage_stage_seconds", (rules_done - start) / len(emails), {"stage": "rules"})
+
+        results = [None] * len(emails)
+        llm_bound = []
+        for i, rule_result in enumerate(rule_results):
+            if rule_result["confidence"] >= self.threshold:
+                results[i] = {
+                    "final_label": rule_result["label"],
+                    "final_confidence": rule_result["confidence"],
+                    "source": "rules"
+                }
+            else:
+                llm_bound.append(i)
+
+        # Near-duplicates of earlier emails, or of another email in this batch, skip the LLM
+        signatures = {}
+        copies = {}
+        if self.near_duplicates is not None and llm_bound:
+            unmatched = []
+            for i in llm_bound:
+                signatures[i], results[i] = self._near_duplicate(emails[i].get("subject", ""), emails[i].get("body", ""))
+                if results[i] is None:
+                    unmatched.append(i)
+            firsts = self.near_duplicates.group([signatures[i] for i in unmatched])
+            llm_bound = []
+            for i, first in zip(unmatched, firsts):
+                if unmatched[first] == i:
+                    llm_bound.append(i)
+                else:
+                    copies.setdefault(unmatched[first], []).append(i)
+
+        voted = self._knn([(emails[i].get("subject", ""), emails[i].get("body", "")) for i in llm_bound])
+        for i, vote in zip(llm_bound, voted):
+            results[i] = vote
+        llm_bound = [i for i in llm_bound if results[i] is None]
+
+        # Low-confidence emails go to the LLM packed several per request. A batch
+        # with none left never touches self.llm, so the client is not even created.
+        llm_results = []
+        if llm_bound:
+            llm_started = time.perf_counter()
+            try:
+                llm_results = self.llm.classify_many(
+                    (emails[i].get("subject", ""), emails[i].get("body", "")) for i in llm_bound
+                )
+            except LLMUnavailable:
+                for i in llm_bound:
+                    results[i] = self._degraded(rule_results[i])
+                llm_bound = []
+            if llm_bound:
+                METRICS.observe("triage_stage_seconds", (time.perf_counter() - llm_started) / len(llm_bound), {"stage": "llm"})
+        for i, llm_result in zip(llm_bound, llm_results):
+            results[i] = {
+                "final_label": llm_result["label"],
+                "final_confidence": llm_result["confidence"],
+                "source": "llm"
+            }
+            if self.near_duplicates is not None:
+                self._remember(signatures.get(i), llm_result)
+
+        for i, same in copies.items():
+            for j in same:
+                if results[i]["source"] == "rules":
+                    # The LLM was unavailable for the first copy; nothing to reuse
+                    results[j] = self._degraded(rule_results[j])
+                    continue
+                METRICS.inc("triage_near_duplicate_total", {"result": "batch_hit"})
+                results[j] = dict(results[i], source="near_duplicate")
+
+        for result in results:
+            self._record(result)
+
+        return results
+
+    async def arun(self, email):
+        """
+        Async run(). Rule-confident emails return without awaiting anything;
+        the rest go through LLMFallbackTriage.aclassify, which bounds how many
+        requests are in flight. If the LLM call times out or the provider is
+        degraded, the rule result is returned instead (source "rules").
+        """
+
+        subject = email.get("subject", "")
+        body = email.get("body", "")
+        sender = email.get("sender", "")
+
+        start = time.perf_counter()
+
+        rule_result = self.rules.classify(subject, body, sender)
+        rule_label = rule_result["label"]
+        rule_conf = rule_result["confidence"]
+        rules_done = time.perf_counter()
+        METRICS.observe("triage_stage_seconds", rules_done - start, {"stage": "rules"})
+
+        if rule_conf >= self.threshold:
+            return self._record({
+                "final_label": rule_label,
+                "final_confidence": rule_conf,
+                "source": "rules"
+            }, start)
+
+        signature, reused = self._near_duplicate(subject, body)
+        if reused is not None:
+            return self._record(reused, start)
+
+        voted = self._knn([(subject, body)])[0]
+        if voted is not None:
+            return self._record(voted, start)
+
+        llm_started = time.perf_counter()
+        try:
+            llm_result = await self.llm.aclassify(subject, body)
+        except asyncio.TimeoutError:
+            METRICS.inc("llm_timeouts_total")
+            return self._record({
+                "final_label": rule_label,
+                "final_confidence": rule_conf,
+                "source": "rules"
+            }, start)
+        except LLMUnavailable:
+            return self._record(self._degraded(rule_result), start)
+        METRICS.observe("triage_stage_seconds", time.perf_counter() - llm_started, {"stage": "llm"})
+        self._remember(signature, llm_result)
+
+        return self._record({
+            "final_label": llm_result["label"],
+            "final_confidence": llm_result["confidence"],
+            "source": "llm"
+        }, start)
+
+    async def arun_batch(self, emails):
+        """Run arun() over many emails concurrently; results keep input order."""
+        return await asyncio.gather(*(self.arun(email) for email in emails))
+
     def triage_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         email = state.get("email_text", "")
 
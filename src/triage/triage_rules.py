@@ -1,8 +1,54 @@
-import re
+import hashlib
+import json
+
+from triage import rule_calibration
+
+
+class KeywordMatcher:
+    """Keyword table compiled once and matched against already lower-cased text.
+
+    categories: list of (label, keywords) in priority order. Each distinct
+    keyword is probed at most once per text (one already probed for an earlier
+    category missed, or that category would have matched), and keywords that
+    can never match lower-cased text (e.g. "Teams") are dropped at compile time.
+    """
+
+    def __init__(self, categories):
+        self.categories = [(label, tuple(keywords)) for label, keywords in categories]
+
+        probed = set()
+        self._plan = []
+        for label, keywords in self.categories:
+            live = tuple(dict.fromkeys(kw for kw in keywords if kw == kw.lower() and kw not in probed))
+            probed.update(live)
+            self._plan.append((label, live, len(keywords)))
+
+    def match(self, text):
+        """Return (label, matched, total) for the first category with a hit, else None."""
+        hit = self.match_keywords(text)
+        if hit is None:
+            return None
+        label, keywords, total = hit
+        return label, len(keywords), total
+
+    def match_keywords(self, text):
+        """Like match(), but with the list of matched keywords instead of their count."""
+        for label, keywords, total in self._plan:
+            hits = [kw for kw in keywords if kw in text]
+            if hits:
+                return label, hits, total
+        return None
+
 
 class TriageRules:
 
-    def __init__(email):
+    def __init__(email, calibration=True):
+        #calibration: True for data/rule_calibration.json if it was fitted, a RuleCalibration,
+        #or False for the raw matched/total keyword confidence
+        if calibration is True:
+            calibration = rule_calibration.load_default()
+        email.calibration = calibration or None
+
         email.spam_keywords = [
             "win money", "you won", "lottery", "claim now", "urgent",
             "100% free", "click here", "urgent prize"
@@ -33,6 +79,28 @@ class TriageRules:
             "delivery", "package"
         ]
 
+        email.matcher = email.compile_keywords()
+
+    def compile_keywords(email):
+        """(Re)build the matcher from the keyword lists; call again after editing them."""
+        return KeywordMatcher([
+            ("spam", email.spam_keywords),
+            ("promotion", email.promotion_keywords),
+            ("finance", email.finance_keywords),
+            ("meeting", email.meeting_keywords),
+            ("job_related", email.job_keywords),
+            ("transactional", email.transactional_keywords),
+        ])
+
+    def fingerprint(email):
+        """Stable hash of the keyword table and calibration; changes whenever either does."""
+        table = [[label, list(keywords)] for label, keywords in email.matcher.categories]
+        raw = json.dumps({
+            "categories": table, "automated_sender": "noreply",
+            "calibration": email.calibration.fingerprint() if email.calibration else None,
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
     def contains_keyword(email, text, keywords):
         text = text.lower()
         return any(kw in text for kw in keywords)
@@ -51,48 +119,19 @@ class TriageRules:
 
     def classify(email, subject, body, sender=""):
 
-        full_text = f"{subject} {body}".lower()
-
-        if email.contains_keyword(full_text, email.spam_keywords):
-            return {
-                "label": "spam",
-                "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.spam_keywords)
-            }
+        if email.calibration is not None:
+            return email._classify_calibrated(subject, body, sender)
 
-        if email.contains_keyword(full_text, email.promotion_keywords):
-            return {
-                "label": "promotion",
-                "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.promotion_keywords)
-            }
-
-        if email.contains_keyword(full_text, email.finance_keywords):
-            return {
-                "label": "finance",
-                "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.finance_keywords)
-            }
-
-        if email.contains_keyword(full_text, email.meeting_keywords):
-            return {
-                "label": "meeting",
-                "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.meeting_keywords)
-            }
-        
-        if email.contains_keyword(full_text, email.job_keywords):
-            return {
-                "label": "job_related",
-                "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.job_keywords)
-            }
+        full_text = f"{subject} {body}".lower()
 
-        if email.contains_keyword(full_text, email.transactional_keywords):
+        # Compiled keyword table: each distinct keyword probed at most once, in category priority order
+        hit = email.matcher.match(full_text)
+        if hit:
+            label, matched, total = hit
             return {
-                "label": "transactional",
+                "label": label,
                 "source": "rule",
-                "confidence": email._keyword_confidence(full_text, email.transactional_keywords)
+                "confidence": round(matched / total, 2)
             }
 
         if "noreply" in sender.lower():
@@ -108,6 +147,22 @@ class TriageRules:
             "confidence": 0.0
         }
 
+    def _classify_calibrated(email, subject, body, sender):
+        # Same labels as classify(); confidence from the fitted keyword/position precisions
+        hit = rule_calibration.rule_features(email, subject, body, sender)
+        if hit is None:
+            return {"label": "uncertain", "source": "rule", "confidence": 0.0}
+        label, features = hit
+        return {"label": label, "source": "rule", "confidence": email.calibration.confidence(label, features)}
+
+    def classify_batch(email, emails):
+        """Classify an iterable of {"subject", "body", "sender"} dicts; results keep input order."""
+        classify = email.classify
+        return [
+            classify(e.get("subject", ""), e.get("body", ""), e.get("sender", ""))
+            for e in emails
+        ]
+
 if __name__ == "__main__":
     triage = TriageRules()
 
@@ -1,11 +1,25 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Read from the environment (after .env is loaded) on first access: utils.config.OPENAI_API_KEY
+_ENV_KEYS = ("OPENAI_API_KEY", "GOOGLE_API_KEY", "LANGSMITH_API_KEY")
+_env_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ once per process; variables already set win."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def __getattr__(name):
+    if name in _ENV_KEYS:
+        load_env()
+        return os.getenv(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
 
 def require_env(key: str, val: str):
     if not val:
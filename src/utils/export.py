@@ -0,0 +1,221 @@
+"""Streaming tabular export shared by the evaluator and the ReAct CLI.
+
+Rows are written as they are produced instead of building a whole workbook
+in memory. The output format follows the file extension:
+
+    .xlsx     openpyxl write-only workbook, one worksheet per sheet
+    .csv      one CSV file per sheet: <name>.<Sheet>.csv (or <name>.csv for the first)
+    .jsonl    one JSON object per row: {"sheet": ..., "row": {...}}
+    .parquet  one Parquet file per sheet via pyarrow, written in row groups
+
+    with open_exporter("data/triage_results.xlsx") as out:
+        summary = out.sheet("Summary", ["Category", "Count"])
+        summary.write(["Spam", 3])
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+
+def _cell(value):
+    # Nested values are stored as JSON text in every format
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _ensure_dir(path):
+    out_dir = os.path.dirname(path)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+
+
+def _sheet_path(path, name, first):
+    if first:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{name}{ext}"
+
+
+class _XlsxSheet:
+    def __init__(self, ws):
+        self.ws = ws
+
+    def write(self, row):
+        self.ws.append([_cell(v) for v in row])
+
+
+class _XlsxExporter:
+    def __init__(self, path):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("openpyxl is not installed. Please add it to requirements or install it.")
+        self.path = path
+        self.wb = Workbook(write_only=True)
+
+    def sheet(self, name, header=None):
+        sheet = _XlsxSheet(self.wb.create_sheet(name))
+        if header:
+            sheet.write(header)
+        return sheet
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class _CsvSheet:
+    def __init__(self, path, header):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.f)
+        if header:
+            self.writer.writerow(header)
+
+    def write(self, row):
+        self.writer.writerow([_cell(v) for v in row])
+
+
+class _CsvExporter:
+    def __init__(self, path):
+        self.path = path
+        self.sheets = []
+
+    def sheet(self, name, header=None):
+        sheet = _CsvSheet(_sheet_path(self.path, name, not self.sheets), header)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        for sheet in self.sheets:
+            sheet.f.close()
+
+
+class _JsonlSheet:
+    def __init__(self, f, name, header):
+        self.f = f
+        self.name = name
+        self.header = list(header) if header else None
+
+    def write(self, row):
+        row = [_cell(v) for v in row]
+        if self.header and len(row) <= len(self.header):
+            row = dict(zip(self.header, row))
+        self.f.write(json.dumps({"sheet": self.name, "row": row}, ensure_ascii=False) + "\n")
+
+
+class _JsonlExporter:
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def sheet(self, name, header=None):
+        return _JsonlSheet(self.f, name, header)
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSheet:
+    def __init__(self, pa, pq, path, header, row_group_size):
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.header = list(header) if header else None
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.writer = None
+
+    def write(self, row):
+        if not row:
+            return
+        if self.header is None:
+            # Without a header, the first row names the columns
+            self.header = [str(v) for v in row]
+            return
+        row = [_cell(v) for v in row][:len(self.header)]
+        row += [None] * (len(self.header) - len(row))
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def _array(self, values, type=None):
+        try:
+            return self.pa.array(values, type=type)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError, TypeError):
+            if type is not None and not self.pa.types.is_string(type):
+                raise ValueError(f"Parquet column of type {type} got incompatible values in {self.path}")
+            # Mixed types in one column: keep them as text
+            return self.pa.array([None if v is None else str(v) for v in values], type=self.pa.string())
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = [list(c) for c in zip(*self.rows)]
+        if self.writer is None:
+            arrays = []
+            for values in columns:
+                array = self._array(values)
+                # An all-empty first row group would pin the column to the null type
+                if self.pa.types.is_null(array.type):
+                    array = array.cast(self.pa.string())
+                arrays.append(array)
+            table = self.pa.Table.from_arrays(arrays, names=self.header)
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        else:
+            # Later row groups must match the schema of the first one
+            schema = self.writer.schema_arrow
+            table = self.pa.Table.from_arrays(
+                [self._array(values, field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _ParquetExporter:
+    def __init__(self, path, row_group_size=10_000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is not installed. Install it to export Parquet files.")
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.row_group_size = row_group_size
+        self.sheets = []
+
+    def sheet(self, name, header=None):
+        sheet = _ParquetSheet(self.pa, self.pq, _sheet_path(self.path, name, not self.sheets), header, self.row_group_size)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        for sheet in self.sheets:
+            sheet.close()
+
+
+EXPORTERS = {
+    ".xlsx": _XlsxExporter,
+    ".csv": _CsvExporter,
+    ".jsonl": _JsonlExporter,
+    ".parquet": _ParquetExporter,
+}
+
+
+@contextmanager
+def open_exporter(path):
+    """Yield an exporter for `path` (format from the extension) and close it on exit."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"Unsupported export format '{ext}'. Use one of: {', '.join(EXPORTERS)}")
+    _ensure_dir(path)
+    exporter = EXPORTERS[ext](path)
+    try:
+        yield exporter
+    finally:
+        exporter.close()
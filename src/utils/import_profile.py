@@ -0,0 +1,120 @@
+"""Per-module import cost, so start-up regressions are visible.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+and reported with its total time and the heaviest top-level packages it
+pulled in. Modules in RULES_ONLY must not load the LLM stack; a module that
+does, or that goes over --budget-ms, makes the command exit with status 1.
+
+Run from src/:
+  python -m utils.import_profile
+  python -m utils.import_profile triage.triage_node --top 15 --repeat 3 --budget-ms 250
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_MODULES = (
+    "triage.triage_rules",
+    "triage.triage_node",
+    "triage.triage_llm",
+    "workflow.triage_workflow",
+    "workflow.email_pipeline",
+    "workflow.ingest",
+    "agents.react_loop",
+    "main_ReAct",
+)
+
+# Importing these must not load any LLM client library
+RULES_ONLY = ("triage.triage_rules", "triage.triage_node", "triage.triage_llm",
+              "workflow.triage_workflow", "agents.react_loop", "main_ReAct")
+LLM_STACK = ("langchain", "langchain_core", "langchain_openai", "langsmith", "openai")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_import(module, python=sys.executable, cwd=SRC_DIR):
+    """
+    Import `module` in a fresh interpreter and return
+    {"module", "total_ms", "modules", "packages": {top-level package: ms}}.
+    Package times are cumulative, so nested packages are also counted in their parent.
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    total_us, count, packages = 0, 0, {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        count += 1
+        cumulative, name = int(match.group(2)), match.group(4)
+        if name == module:
+            total_us = cumulative
+        root = name.split(".")[0]
+        if name == root:
+            packages[root] = max(packages.get(root, 0), cumulative)
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "modules": count,
+        "packages": {name: round(us / 1000, 1) for name, us in packages.items()},
+    }
+
+
+def profile(modules=DEFAULT_MODULES, repeat=1):
+    """profile_import() for each module, keeping the fastest of `repeat` runs."""
+    results = []
+    for module in modules:
+        runs = [profile_import(module) for _ in range(max(1, repeat))]
+        results.append(min(runs, key=lambda r: r["total_ms"]))
+    return results
+
+
+def violations(result, budget_ms=None):
+    """Reasons this result should fail the check: LLM stack in a rules-only module, or over budget."""
+    problems = []
+    if result["module"] in RULES_ONLY:
+        loaded = sorted(p for p in LLM_STACK if p in result["packages"])
+        if loaded:
+            problems.append(f"loads the LLM stack ({', '.join(loaded)})")
+    if budget_ms is not None and result["total_ms"] > budget_ms:
+        problems.append(f"{result['total_ms']} ms is over the {budget_ms} ms budget")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report per-module import cost")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level packages to list per module")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per module; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if any module takes longer to import")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = profile(args.modules, repeat=args.repeat)
+    failed = False
+    for result in results:
+        result["violations"] = violations(result, args.budget_ms)
+        failed = failed or bool(result["violations"])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            own = result["module"].split(".")[0]
+            heaviest = sorted(((ms, name) for name, ms in result["packages"].items() if name != own), reverse=True)
+            print(f"{result['module']:<28}{result['total_ms']:>9.1f} ms  {result['modules']:>5} modules")
+            for ms, name in heaviest[:args.top]:
+                print(f"    {name:<24}{ms:>9.1f} ms")
+            for problem in result["violations"]:
+                print(f"    !! {problem}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING
+
+from utils.config import load_env
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+logger = logging.getLogger(__name__)
+
+# One connection pool for every client, so TLS sessions survive across emails
+_http_client = None
+_clients = {}
+_stats = {"created": 0, "reused": 0}
+_lock = threading.Lock()
+
+
+def _shared_http_client() -> "httpx.Client":
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _http_client
+
+
+def get_chat_model(model: str = DEFAULT_MODEL, temperature=None, api_key=None) -> "ChatOpenAI":
+    """
+    Return the process-wide ChatOpenAI client for this configuration.
+
+    Clients are created once per (model, temperature, api_key) and shared by
+    every caller; all of them use the same HTTP connection pool.
+    langchain_openai is imported on the first call, not with this module.
+    """
+    load_env()
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if hasattr(api_key, "get_secret_value"):
+        api_key = api_key.get_secret_value()
+
+    key = (model, temperature, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _stats["reused"] += 1
+            return client
+
+        from langchain_openai import ChatOpenAI
+
+        # Retries are left to utils.llm_gateway, which also rate-limits and trips the breaker
+        kwargs = {"model": model, "api_key": api_key, "http_client": _shared_http_client(), "max_retries": 0}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        client = ChatOpenAI(**kwargs)
+        _clients[key] = client
+        _stats["created"] += 1
+        return client
+
+
+def warm_up(configs=None, connect: bool = False) -> int:
+    """
+    Create clients ahead of the first email.
+
+    configs: iterable of (model, temperature) pairs; defaults to the ones the
+    triage and agent code use. With connect=True a cheap models.list() call
+    opens the pooled TLS connection too; a failed connection is logged as a
+    warning and the client is still counted. Returns the number of clients ready.
+    """
+    configs = configs or [(DEFAULT_MODEL, 0), (DEFAULT_MODEL, None)]
+    ready = 0
+    for model, temperature in configs:
+        client = get_chat_model(model, temperature)
+        ready += 1
+        if connect:
+            try:
+                client.root_client.with_options(max_retries=0).models.list()
+            except Exception as e:
+                logger.warning("LLM warm-up connection failed for %s: %s", model, e)
+    return ready
+
+
+def registry_stats() -> dict:
+    """Return client counts and how often an existing client was reused."""
+    with _lock:
+        created, reused = _stats["created"], _stats["reused"]
+        lookups = created + reused
+        return {
+            "clients": len(_clients),
+            "created": created,
+            "reused": reused,
+            "reuse_rate": round(reused / lookups, 4) if lookups else 0.0,
+        }
+
+
+def reset_registry():
+    """Drop all cached clients and close the shared connection pool."""
+    global _http_client
+    with _lock:
+        _clients.clear()
+        _stats["created"] = _stats["reused"] = 0
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
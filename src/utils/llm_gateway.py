@@ -0,0 +1,328 @@
+"""Rate limiting, retries and a circuit breaker shared by every LLM call.
+
+Call sites hand their runnable (a ChatOpenAI client or a prompt | model
+chain) to get_gateway().invoke() / ainvoke() instead of calling it directly:
+
+- Two token buckets, one for requests and one for estimated tokens per
+  minute, pace calls below the provider's limits. A caller that would
+  overdraw a bucket waits for its turn.
+- Rate limits, timeouts, connection errors and 5xx answers are retried with
+  full-jitter exponential backoff, honouring Retry-After when the provider
+  sends one. Other errors (bad request, auth) are raised at once.
+- After `failure_threshold` consecutive retryable failures the breaker
+  opens: calls fail fast with LLMUnavailable for `reset_timeout` seconds,
+  then a single probe decides whether to close it again. Callers catch
+  LLMUnavailable to degrade (triage falls back to its rules).
+
+Limits come from LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE and
+LLM_MAX_RETRIES when set.
+"""
+import os
+import random
+import threading
+import time
+
+from utils.config import load_env
+from utils.metrics import METRICS
+
+METRICS.describe("llm_gateway_throttled_total", "LLM calls delayed by the gateway rate limiter, by bucket (requests, tokens)")
+METRICS.describe("llm_gateway_throttle_seconds", "Time LLM calls waited for the rate limiter")
+METRICS.describe("llm_gateway_retries_total", "LLM call attempts retried after a retryable error, by error type")
+METRICS.describe("llm_gateway_breaker_transitions_total", "Circuit breaker state changes, by new state (open, half_open, closed)")
+METRICS.describe("llm_gateway_rejected_total", "LLM calls refused without a request, by reason (breaker_open, retries_exhausted)")
+
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+
+# Answers worth retrying; anything else is a problem with the request itself
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "TimeoutException", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+
+# Rough prompt size estimate; ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_TOKENS = 256
+
+
+class LLMUnavailable(RuntimeError):
+    """The provider is degraded: the breaker is open or retries ran out."""
+
+
+def _status(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if _status(error) in RETRYABLE_STATUS:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error):
+    # Seconds from a Retry-After header, or None
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(value):
+    """Prompt tokens for a string, a dict of template variables or a list of messages."""
+    if isinstance(value, dict):
+        chars = sum(len(str(v)) for v in value.values())
+    elif isinstance(value, (list, tuple)):
+        chars = sum(len(str(getattr(m, "content", m))) for m in value)
+    else:
+        chars = len(str(value))
+    return chars // CHARS_PER_TOKEN
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 per second up to `capacity` (ten seconds'
+    worth by default). reserve() takes what a call needs straight away, going
+    negative if it must, and returns how long the caller has to wait; later
+    callers queue behind it.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 6.0)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """Take `amount` (at most `capacity`) and return the seconds to wait before using it."""
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def adjust(self, amount):
+        """Take (positive) or give back (negative) `amount` after the fact, e.g. actual vs estimated tokens."""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds, letting one probe through;
+    half_open -> closed on its success, back to open on its failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"trips": 0, "rejected": 0}
+
+    def _move(self, state):
+        # Caller holds the lock
+        if state != self.state:
+            self.state = state
+            METRICS.inc("llm_gateway_breaker_transitions_total", {"state": state})
+
+    def is_open(self):
+        """True while calls are refused outright (open and not yet due for a probe)."""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """True if a call may go ahead now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._move("half_open")
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._move("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self._probing = False
+                self._opened_at = time.monotonic()
+                if self.state != "open":
+                    self.stats["trips"] += 1
+                self._move("open")
+
+    def release(self):
+        """Give up a half-open probe that ended without an answer (e.g. cancelled)."""
+        with self._lock:
+            self._probing = False
+
+
+class LLMGateway:
+    """
+    One gateway per process (see get_gateway()), so all call sites share the
+    provider's limits. max_retries counts retries after the first attempt;
+    backoff before retry n is uniform in [0, min(max_delay, base_delay * 2**n)].
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries=4, base_delay=0.5, max_delay=20.0, breaker=None, output_tokens=DEFAULT_OUTPUT_TOKENS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.output_tokens = output_tokens
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "throttle_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def available(self):
+        """False while the breaker is open; callers can skip the LLM without trying."""
+        return not self.breaker.is_open()
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _admit(self, tokens):
+        # Seconds to wait before sending; raises LLMUnavailable while the breaker is open
+        if not self.breaker.allow():
+            METRICS.inc("llm_gateway_rejected_total", {"reason": "breaker_open"})
+            raise LLMUnavailable("LLM circuit breaker is open")
+        request_wait = self.requests.reserve(1)
+        token_wait = self.tokens.reserve(tokens)
+        wait = max(request_wait, token_wait)
+        if wait > 0:
+            self._count("throttled")
+            self._count("throttle_seconds", wait)
+            METRICS.inc("llm_gateway_throttled_total", {"bucket": "requests" if request_wait >= token_wait else "tokens"})
+            METRICS.observe("llm_gateway_throttle_seconds", wait)
+        return wait
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def _settle(self, estimated, response):
+        # Charge the token bucket for what the call actually used, when the response says
+        usage = getattr(response, "usage_metadata", None)
+        if usage and usage.get("total_tokens"):
+            self.tokens.adjust(usage["total_tokens"] - estimated)
+
+    def _failed(self, attempt, error):
+        # Raise unless this error should be retried; returns the backoff delay otherwise
+        if not is_retryable(error):
+            # The provider answered, so as far as the breaker is concerned it is healthy
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            METRICS.inc("llm_gateway_rejected_total", {"reason": "retries_exhausted"})
+            raise LLMUnavailable(f"LLM call failed after {attempt + 1} attempts: {error!r}") from error
+        self._count("retries")
+        METRICS.inc("llm_gateway_retries_total", {"error": type(error).__name__})
+        return self._backoff(attempt, error)
+
+    def invoke(self, runnable, value, tokens=None):
+        """runnable.invoke(value) under the rate limits, with retries and the breaker."""
+        tokens = (estimate_tokens(value) if tokens is None else tokens) + self.output_tokens
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                response = runnable.invoke(value)
+            except Exception as e:
+                time.sleep(self._failed(attempt, e))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            self._settle(tokens, response)
+            return response
+
+    async def ainvoke(self, runnable, value, tokens=None):
+        """Async invoke(); waits and backoff sleep without blocking the event loop."""
+        import asyncio
+        tokens = (estimate_tokens(value) if tokens is None else tokens) + self.output_tokens
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            wait = self._admit(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await runnable.ainvoke(value)
+            except Exception as e:
+                await asyncio.sleep(self._failed(attempt, e))
+                continue
+            except BaseException:
+                # Cancelled, e.g. by an asyncio.wait_for timeout around this call
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            self._settle(tokens, response)
+            return response
+
+    def snapshot(self):
+        """Breaker state plus call, retry and throttle counts."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["throttle_seconds"] = round(stats["throttle_seconds"], 3)
+        stats.update(breaker=self.breaker.state, trips=self.breaker.stats["trips"],
+                     rejected=self.breaker.stats["rejected"])
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """The process-wide gateway, configured from the environment on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            load_env()
+            _gateway = LLMGateway(
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE)),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", 4)),
+            )
+        return _gateway
+
+
+def reset_gateway(gateway=None):
+    """Replace the process-wide gateway (None: rebuild from the environment on next use)."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
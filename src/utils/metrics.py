@@ -0,0 +1,117 @@
+import bisect
+import threading
+
+# Latency buckets in seconds, from sub-millisecond rule matching up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+class Metrics:
+    """
+    Minimal in-process counters and latency histograms.
+
+    Cheap enough to leave on: one lock and a bisect per observation. Read out
+    with snapshot() (JSON-friendly dict) or to_prometheus() (text exposition format).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, labels=None, value=1):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            hist["counts"][index] += 1
+            hist["sum"] += seconds
+            hist["count"] += 1
+
+    def counter_value(self, name, labels=None):
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def counter_total(self, name):
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def counter_sum(self, name, labels):
+        """Sum of the series of `name` whose labels include every item of `labels`."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(v for key, v in self._counters.get(name, {}).items() if wanted <= set(key))
+
+    def snapshot(self):
+        """Counters and histograms as plain dicts; label sets are rendered as "k=v,k=v"."""
+        with self._lock:
+            counters = {
+                name: {",".join(f"{k}={v}" for k, v in key): value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = {}
+                for key, hist in series.items():
+                    histograms[name][",".join(f"{k}={v}" for k, v in key)] = {
+                        "count": hist["count"],
+                        "sum": round(hist["sum"], 6),
+                        "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], hist["counts"])),
+                    }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(self.buckets) + ["+Inf"], hist["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Process-wide registry shared by triage and agent code
+METRICS = Metrics()
@@ -0,0 +1,430 @@
+"""Streaming mailbox ingestion into the triage / email pipeline graphs.
+
+Messages are read one at a time from an mbox file, a Maildir directory or a
+JSONL dump; nothing holds more than the messages currently in flight.
+Each message becomes a LazyEmail mapping with the "id", "subject", "body" and
+"sender" keys triage_node reads; headers and body are only parsed when first
+accessed, and only the text body is decoded (attachments are never read).
+
+ingest() feeds a bounded thread pool: the reader only pulls the next message
+when fewer than `max_pending` are in flight, so a slow graph slows the reader
+down instead of filling memory. The input position is saved in an
+IngestOffsets table as a low watermark (every message before it has finished),
+together with the tokens of the messages past it that have also finished, so a
+restart resumes at the watermark and skips those. A hard crash can still repeat
+the messages finished since the last save (every `commit_every` completions).
+
+Run from src/:  python -m workflow.ingest ~/Mail/inbox.mbox --run-id inbox --workers 8
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser, BytesParser
+from html import unescape
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from workflow.checkpoint import DEFAULT_CHECKPOINT_PATH
+
+# compat32 parsing is several times cheaper than policy.default; headers and
+# charsets are decoded by hand below
+_HEADER_PARSER = BytesHeaderParser()
+_PARSER = BytesParser()
+_TAG = re.compile(r"<[^>]+>")
+
+
+class LazyEmail(Mapping):
+    """Read-only {"id", "subject", "body", "sender"} view over one raw RFC 822 message."""
+
+    __slots__ = ("raw", "position", "_headers", "_fields")
+    KEYS = ("id", "subject", "body", "sender")
+
+    def __init__(self, raw: bytes, position):
+        self.raw = raw
+        self.position = position
+        self._headers = None
+        self._fields = {}
+
+    def _header(self, name):
+        if self._headers is None:
+            self._headers = _HEADER_PARSER.parsebytes(self.raw)
+        value = self._headers.get(name)
+        if value is None:
+            return ""
+        try:
+            return str(make_header(decode_header(str(value))))
+        except (LookupError, UnicodeError, ValueError):
+            return str(value)
+
+    def _body(self):
+        plain = html = None
+        for part in _PARSER.parsebytes(self.raw).walk():
+            if part.is_multipart() or part.get_content_disposition() == "attachment":
+                continue
+            content_type = part.get_content_type()
+            if content_type == "text/plain" and plain is None:
+                plain = part
+            elif content_type == "text/html" and html is None:
+                html = part
+        part = plain or html
+        if part is None:
+            return ""
+        payload = part.get_payload(decode=True) or b""
+        try:
+            text = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+        except LookupError:
+            text = payload.decode("utf-8", errors="replace")
+        if part is html:
+            text = unescape(_TAG.sub(" ", text))
+        return text.strip()
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key not in self._fields:
+            if key == "id":
+                value = self._header("message-id").strip("<> ") or str(self.position)
+            elif key == "subject":
+                value = self._header("subject")
+            elif key == "sender":
+                value = self._header("from")
+            else:
+                value = self._body()
+            self._fields[key] = value
+        return self._fields[key]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+
+# --- sources: each yields (resume token, email) -------------------------------
+# A message whose token is in `skip` (finished by an earlier run) comes as (token, None)
+
+def iter_mbox(path, start=0, skip=()) -> Iterator[Tuple[int, LazyEmail]]:
+    """Messages of an mbox file; the token is the byte offset just past each message."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = []
+        message_start = start
+        prev_blank = True
+        while True:
+            position = f.tell()
+            line = f.readline()
+            # A "From " line after a blank line (or at the start) opens the next message
+            if not line or (line.startswith(b"From ") and prev_blank):
+                if lines:
+                    if lines[0].startswith(b"From "):
+                        lines = lines[1:]
+                    yield position, None if position in skip else LazyEmail(b"".join(lines), message_start)
+                if not line:
+                    return
+                message_start = position
+                lines = []
+            lines.append(line)
+            prev_blank = line in (b"\n", b"\r\n")
+
+
+def iter_maildir(path, start=None, skip=()) -> Iterator[Tuple[str, LazyEmail]]:
+    """Messages of a Maildir (new/ and cur/), by file name; the token is "<subdir>/<name>"."""
+    names = []
+    for sub in ("cur", "new"):
+        folder = os.path.join(path, sub)
+        if os.path.isdir(folder):
+            with os.scandir(folder) as entries:
+                names.extend(f"{sub}/{e.name}" for e in entries if e.is_file() and not e.name.startswith("."))
+    # Maildir names start with the delivery time, so name order is roughly arrival order.
+    # Resume by position rather than by name: a client may have moved the file to cur/ since
+    def order(name):
+        return name.split("/", 1)[1].split(":", 1)[0]
+
+    names.sort(key=order)
+    after = order(start) if start else None
+    skip = {order(name) for name in skip}
+    for name in names:
+        if after is not None and order(name) <= after:
+            continue
+        if order(name) in skip:
+            yield name, None
+            continue
+        try:
+            with open(os.path.join(path, name), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            continue  # moved or deleted by a mail client since listing
+        yield name, LazyEmail(raw, name)
+
+
+def iter_jsonl(path, start=0, skip=()) -> Iterator[Tuple[int, dict]]:
+    """
+    Objects of a JSONL dump; the token is the byte offset just past each line.
+    A line without an "id" or "message_id" is identified by its byte offset,
+    which stays the same wherever a run resumed.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        while True:
+            position = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            if f.tell() in skip:
+                yield f.tell(), None
+                continue
+            item = json.loads(line)
+            yield f.tell(), {
+                "id": str(item.get("id", item.get("message_id", position))),
+                "subject": item.get("subject", ""),
+                "body": item.get("body", item.get("text", "")),
+                "sender": item.get("sender", item.get("from", "")),
+            }
+
+
+def source_kind(path) -> str:
+    if os.path.isdir(path):
+        return "maildir"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "mbox"
+
+
+def iter_messages(path, start=None, skip=()) -> Iterator[Tuple[Any, Mapping]]:
+    """
+    (token, email) pairs from `path`, resuming after `start` (a token from an
+    earlier run); messages whose tokens are in `skip` come as (token, None).
+    """
+    kind = source_kind(path)
+    skip = set(skip)
+    if kind == "maildir":
+        return iter_maildir(path, start, skip)
+    if kind == "jsonl":
+        return iter_jsonl(path, start or 0, skip)
+    return iter_mbox(path, start or 0, skip)
+
+
+# --- offsets -------------------------------------------------------------------
+
+class IngestOffsets:
+    """
+    Resume tokens per source, stored next to the graph checkpoints: the
+    watermark token plus the tokens of messages past it that have finished.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_offsets ("
+            "source TEXT PRIMARY KEY, token TEXT, messages INTEGER, updated_at REAL, finished TEXT)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(ingest_offsets)")}
+        if "finished" not in columns:
+            # Tables written before finished tokens were saved
+            self.conn.execute("ALTER TABLE ingest_offsets ADD COLUMN finished TEXT")
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        """(watermark token, messages done, finished tokens past the watermark); (None, 0, []) if unseen."""
+        row = self.conn.execute(
+            "SELECT token, messages, finished FROM ingest_offsets WHERE source = ?", (source,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1], json.loads(row[2] or "[]")) if row else (None, 0, [])
+
+    def set(self, source, token, messages, finished=()):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingest_offsets (source, token, messages, updated_at, finished) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source, json.dumps(token), messages, time.time(), json.dumps(list(finished))),
+            )
+
+    def reset(self, source):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM ingest_offsets WHERE source = ?", (source,))
+
+    def close(self):
+        self.conn.close()
+
+
+# --- worker pool ---------------------------------------------------------------
+
+def ingest(messages: Iterator[Tuple[Any, Mapping]], handler: Callable[[Mapping], Any], workers: int = 4,
+           max_pending: Optional[int] = None, on_watermark: Optional[Callable[[Any, int, list], None]] = None,
+           commit_every: int = 50):
+    """
+    Run handler(email) for each (token, email) on `workers` threads; yields (email, result, error).
+
+    At most `max_pending` messages (default 2 x workers) are read ahead. Results
+    come back in completion order. on_watermark(token, done, finished) is
+    called every `commit_every` completions and at the end with the token of
+    the last message before which everything has finished, and the tokens of
+    the messages after it that have finished too. A handler error is yielded
+    with its email and counts as finished; it is not retried on resume.
+    A (token, None) pair is a message an earlier run finished: it is not run
+    or yielded, but counts towards the watermark.
+    """
+    max_pending = max_pending or workers * 2
+    slots = threading.Semaphore(max_pending)
+    ready = threading.Condition()
+    finished = []  # (seq, (email, result, error)) not yet handed to the caller
+    tokens = {}
+    delivered = set()  # seqs handed to the caller, above the watermark
+    state = {"next_seq": 0, "watermark": 0, "done": 0, "skipped": 0, "since_commit": 0, "token": None}
+
+    def run(seq, email):
+        try:
+            outcome = (email, handler(email), None)
+        except Exception as e:
+            outcome = (email, None, e)
+        # Free the slot first, so a reader woken by notify() can always take it
+        slots.release()
+        with ready:
+            finished.append((seq, outcome))
+            ready.notify()
+
+    def advance():
+        # Move the watermark over every contiguous delivered sequence number
+        while state["watermark"] in delivered:
+            delivered.discard(state["watermark"])
+            state["token"] = tokens.pop(state["watermark"])
+            state["watermark"] += 1
+
+    def save():
+        on_watermark(state["token"], state["done"], [tokens[seq] for seq in sorted(delivered)])
+
+    def deliver(block):
+        with ready:
+            if block:
+                while not finished:
+                    ready.wait()
+            batch = finished[:]
+            finished.clear()
+        for seq, outcome in batch:
+            try:
+                yield outcome
+            finally:
+                # Done once the caller comes back for the next result or closes the generator
+                delivered.add(seq)
+                state["done"] += 1
+                state["since_commit"] += 1
+        advance()
+        if on_watermark and state["since_commit"] >= commit_every:
+            state["since_commit"] = 0
+            save()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            for token, email in messages:
+                if email is None:
+                    tokens[state["next_seq"]] = token
+                    delivered.add(state["next_seq"])
+                    state["next_seq"] += 1
+                    state["skipped"] += 1
+                    continue
+                # Backpressure: wait for a free slot before reading further
+                while not slots.acquire(blocking=False):
+                    yield from deliver(block=True)
+                tokens[state["next_seq"]] = token
+                pool.submit(run, state["next_seq"], email)
+                state["next_seq"] += 1
+                yield from deliver(block=False)
+            while state["done"] + state["skipped"] < state["next_seq"]:
+                yield from deliver(block=True)
+    finally:
+        # Also on close() or an interrupt: save progress up to the last delivered message
+        advance()
+        if on_watermark and state["done"]:
+            save()
+
+
+if __name__ == "__main__":
+    from workflow.checkpoint import SqliteCheckpointSaver
+    from workflow.email_pipeline import create_email_pipeline
+    from workflow.triage_workflow import create_triage_workflow
+
+    parser = argparse.ArgumentParser(description="Stream an mbox / Maildir / JSONL mailbox through the email graph")
+    parser.add_argument("source", help="mbox file, Maildir directory or .jsonl dump")
+    parser.add_argument("--graph", choices=("pipeline", "triage"), default="pipeline")
+    parser.add_argument("--run-id", type=str, default="ingest", help="Re-use a run id to resume it")
+    parser.add_argument("--db", type=str, default=DEFAULT_CHECKPOINT_PATH, help="Checkpoints and input offsets")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=None, help="Messages read ahead (default 2 x workers)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved offset and read from the start")
+    parser.add_argument("--out", type=str, default=None,
+                        help="Append one JSON result per line here; a resumed run only adds the messages it processes")
+    parser.add_argument("--review-db", type=str, default=None, help="Queue reasoned emails for HITL review (pipeline graph)")
+    args = parser.parse_args()
+
+    source_key = f"{args.run_id}:{os.path.abspath(args.source)}"
+    offsets = IngestOffsets(args.db)
+    if args.restart:
+        offsets.reset(source_key)
+    start, already_done, finished = offsets.get(source_key)
+
+    saver = SqliteCheckpointSaver(args.db) if args.graph == "pipeline" else None
+    review_queue = None
+    if args.review_db:
+        from dashboard.review_queue import ReviewQueue
+        review_queue = ReviewQueue(args.review_db)
+    graph = create_email_pipeline(checkpointer=saver, review_queue=review_queue) if saver else create_triage_workflow()
+
+    def handle(email):
+        state = {"email_id": email["id"], "subject": email["subject"], "body": email["body"], "sender": email["sender"]}
+        if saver is None:
+            return graph.invoke(state)
+        config = {"configurable": {"thread_id": f"{args.run_id}:{email['id']}"}}
+        snapshot = graph.get_state(config)
+        if snapshot.values.get("final") is not None and not snapshot.next:
+            return snapshot.values["final"]
+        return graph.invoke(None if snapshot.next else state, config)["final"]
+
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+
+    def save_offset(token, done, done_ahead):
+        # Results and checkpoints reach disk before the offset that claims them
+        if out:
+            out.flush()
+        if saver is not None:
+            saver.flush()
+        offsets.set(source_key, token if token is not None else start, already_done + done, done_ahead)
+
+    processed = errors = 0
+    started = time.perf_counter()
+    results = ingest(iter_messages(args.source, start, finished), handle, workers=args.workers,
+                     max_pending=args.max_pending, on_watermark=save_offset)
+    try:
+        for email, result, error in results:
+            processed += 1
+            if error is not None:
+                errors += 1
+                result = {"email_id": email["id"], "error": str(error)}
+            if out:
+                out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+    finally:
+        results.close()
+        if out:
+            out.close()
+        if saver is not None:
+            saver.close()
+        offsets.close()
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "source": args.source,
+        "resumed_from": start,
+        "processed": processed,
+        "errors": errors,
+        "emails_per_sec": round(processed / elapsed, 1) if elapsed else None,
+    }, indent=2, default=str))
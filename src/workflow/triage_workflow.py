@@ -1,14 +1,7 @@
-from langgraph.graph import StateGraph
-from langgraph.checkpoint.memory import MemorySaver
 from triage.triage_node import TriageNode
 
 
-def triage_node(state: dict) -> dict:
-
-    #Returns a dict: {"label": str, "confidence": float, "source": "rules" | "llm"}.
-    
-    triage = TriageNode()
-
+def _email_from_state(state: dict) -> dict:
     # Allow simple input via `email_text`
     email_text = state.get("email_text", "")
     subject = state.get("subject", "")
@@ -19,12 +12,14 @@ def triage_node(state: dict) -> dict:
         # Treat the text as body; subject left empty
         body = email_text
 
-    result = triage.run({
+    return {
         "subject": subject,
         "body": body,
         "sender": sender,
-    })
+    }
 
+
+def _to_output(result: dict) -> dict:
     return {
         "label": result.get("final_label"),
         "confidence": result.get("final_confidence"),
@@ -32,6 +27,40 @@ def triage_node(state: dict) -> dict:
     }
 
 
+# One TriageNode per process: its rules and LLM client are reused across invocations
+_triage = None
+
+
+def _get_triage() -> TriageNode:
+    global _triage
+    if _triage is None:
+        _triage = TriageNode()
+    return _triage
+
+
+def triage_node(state: dict) -> dict:
+
+    #Returns a dict: {"label": str, "confidence": float, "source": "rules" | "llm"}.
+    
+    triage = _get_triage()
+
+    result = triage.run(_email_from_state(state))
+
+    return _to_output(result)
+
+
+def triage_batch_node(state: dict) -> dict:
+
+    #Input: {"emails": [state, ...]} where each item has the keys triage_node reads.
+    #Returns {"results": [...]} in input order, one triage_node-shaped dict per email.
+
+    triage = _get_triage()
+
+    results = triage.run_batch(_email_from_state(s) for s in state.get("emails", []))
+
+    return {"results": [_to_output(r) for r in results]}
+
+
 def create_triage_workflow():
     """
     Builds the LangGraph workflow for the triage system.
@@ -39,6 +68,7 @@ def create_triage_workflow():
     Input: {"email_text": "..."}
     Output: {"label": "...", "confidence": float, "source": "rule" | "llm"}
     """
+    from langgraph.graph import StateGraph
 
     workflow = StateGraph(dict)
 
@@ -53,6 +83,24 @@ def create_triage_workflow():
     return workflow.compile()
 
 
+def create_triage_batch_workflow():
+    """
+    Builds the batch variant of the triage workflow: one graph invocation per batch.
+    Input: {"emails": [{"email_text": "..."} | {"subject": ..., "body": ..., "sender": ...}, ...]}
+    Output: {"results": [{"label": "...", "confidence": float, "source": "rules" | "llm"}, ...]}
+    """
+    from langgraph.graph import StateGraph
+
+    workflow = StateGraph(dict)
+
+    workflow.add_node("triage_batch", triage_batch_node)
+
+    workflow.set_entry_point("triage_batch")
+    workflow.set_finish_point("triage_batch")
+
+    return workflow.compile()
+
+
 if __name__ == "__main__":
     graph = create_triage_workflow()
 
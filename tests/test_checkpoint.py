@@ -0,0 +1,56 @@
+import sqlite3
+import time
+from typing import TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from workflow.checkpoint import SqliteCheckpointSaver
+
+
+class State(TypedDict):
+    count: int
+
+
+def build_graph(saver):
+    graph = StateGraph(State)
+    graph.add_node("step", lambda state: {"count": state["count"] + 1})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+def stored_checkpoints(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_idle_buffer_is_flushed_after_the_interval(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    saver = SqliteCheckpointSaver(path, batch_size=1000, flush_interval=0.5)
+    build_graph(saver).invoke({"count": 0}, {"configurable": {"thread_id": "t1"}})
+    assert stored_checkpoints(path) == 0
+
+    deadline = time.monotonic() + 5
+    while not stored_checkpoints(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert stored_checkpoints(path) > 0
+    saver.close()
+
+
+def test_reads_see_buffered_checkpoints_and_close_flushes(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    saver = SqliteCheckpointSaver(path, batch_size=1000, flush_interval=60)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    graph.invoke({"count": 1}, config)
+    assert graph.get_state(config).values == {"count": 2}
+
+    graph.invoke({"count": 5}, {"configurable": {"thread_id": "t2"}})
+    saver.close()
+
+    reopened = SqliteCheckpointSaver(path)
+    assert build_graph(reopened).get_state({"configurable": {"thread_id": "t2"}}).values == {"count": 6}
+    reopened.close()
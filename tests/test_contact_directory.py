@@ -0,0 +1,40 @@
+import os
+
+from tools.contact_directory import ContactDirectory
+
+RECORDS = [
+    ("Alice Smith", "alice@example.com", "555-0100", "ally"),
+    ("Bob Jones", "bob.jones@example.com", "555-0101", ""),
+    ("Carol Alison", "carol@example.org", "555-0102", ""),
+]
+
+
+def names(results):
+    return [contact["name"] for _, contact in results]
+
+
+def test_exact_keys_rank_above_prefixes_and_substrings():
+    directory = ContactDirectory.from_records(RECORDS)
+    assert names(directory.search("alice@example.com")) == ["Alice Smith"]
+    assert names(directory.search("ally")) == ["Alice Smith"]
+    assert names(directory.search("ali")) == ["Alice Smith", "Carol Alison"]
+    assert names(directory.search("lison")) == ["Carol Alison"]
+    assert directory.search("   ") == [] and directory.search("zzz") == []
+
+
+def test_short_queries_scan_the_records():
+    directory = ContactDirectory.from_records(RECORDS)
+    assert names(directory.search("li")) == ["Alice Smith", "Carol Alison"]
+    assert names(directory.search("o", limit=2)) == ["Alice Smith", "Bob Jones"]
+
+
+def test_index_file_is_rebuilt_when_the_source_changes(tmp_path):
+    source = tmp_path / "contacts.csv"
+    source.write_text("name,email,phone\nAlice Smith,alice@example.com,1\n", encoding="utf-8")
+    assert names(ContactDirectory.open(str(source)).search("alice")) == ["Alice Smith"]
+    assert os.path.exists(str(source) + ".idx")
+
+    source.write_text("name,email,phone\nDana White,dana@example.com,2\n", encoding="utf-8")
+    os.utime(source, ns=(1, 1))
+    directory = ContactDirectory.open(str(source))
+    assert directory.size == 1 and names(directory.search("dana")) == ["Dana White"]
@@ -0,0 +1,53 @@
+import json
+import threading
+
+from workflow.ingest import IngestOffsets, ingest, iter_jsonl, iter_messages
+
+
+def write_jsonl(path, items):
+    path.write_text("".join(json.dumps(item) + "\n" for item in items), encoding="utf-8")
+    return str(path)
+
+
+def test_fallback_ids_do_not_depend_on_resume_point(tmp_path):
+    path = write_jsonl(tmp_path / "mail.jsonl", [{"subject": f"s{i}"} for i in range(4)])
+    full = [(token, email["id"]) for token, email in iter_jsonl(path)]
+    resumed = [email["id"] for _, email in iter_jsonl(path, start=full[1][0])]
+    assert resumed == [email_id for _, email_id in full[2:]]
+    assert len({email_id for _, email_id in full}) == 4
+
+
+def test_resume_skips_messages_finished_past_the_watermark(tmp_path):
+    path = write_jsonl(tmp_path / "mail.jsonl", [{"id": f"m{i}", "subject": "hi"} for i in range(6)])
+    offsets = IngestOffsets(str(tmp_path / "offsets.db"))
+    save = lambda token, done, finished: offsets.set("src", token, done, finished)
+
+    # m0 is slow, so everything after it finishes first; stop after three results
+    release = threading.Event()
+
+    def slow_first(email):
+        if email["id"] == "m0":
+            release.wait(5)
+        return email["id"]
+
+    first = []
+    results = ingest(iter_messages(path), slow_first, workers=4, max_pending=4, on_watermark=save, commit_every=1)
+    for _, result, _ in results:
+        first.append(result)
+        if len(first) == 3:
+            break
+    release.set()
+    results.close()
+    assert "m0" not in first
+
+    start, done, finished = offsets.get("src")
+    assert start is None and done == 3 and len(finished) == 3
+
+    second = [result for _, result, _ in ingest(iter_messages(path, start, finished), lambda e: e["id"],
+                                                on_watermark=save)]
+    assert sorted(first + second) == [f"m{i}" for i in range(6)]
+
+    start, done, finished = offsets.get("src")
+    assert done == 3 and finished == []
+    assert list(iter_messages(path, start, finished)) == []
+    offsets.close()
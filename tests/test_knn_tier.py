@@ -0,0 +1,44 @@
+from triage.knn_tier import KnnTier, open_default
+
+INVOICES = [
+    {"subject": f"Invoice {n} for your account", "label": "finance",
+     "body": f"Your invoice {n} is attached. The amount due is payable within thirty days by bank transfer."}
+    for n in range(4)
+]
+STANDUPS = [
+    {"subject": f"Standup notes day {n}", "label": "meeting",
+     "body": f"Notes from the standup: agenda, blockers and action items for sprint {n}, next sync on tuesday."}
+    for n in range(4)
+]
+
+
+def test_confident_vote_and_abstain(tmp_path):
+    tier = KnnTier.build(INVOICES + STANDUPS, index_dir=str(tmp_path))
+    result = tier.classify("Invoice 99 for your account", "Your invoice 99 is attached, amount due in thirty days.")
+    assert result["label"] == "finance" and result["source"] == "knn"
+    assert tier.classify("Holiday photos", "Look at these pictures of the beach and the mountains") is None
+
+
+def test_delta_survives_reopen_and_compact(tmp_path):
+    index_dir = str(tmp_path)
+    tier = KnnTier.build(INVOICES, index_dir=index_dir)
+    before = tier.fingerprint()
+    tier.add_many(STANDUPS)
+    assert len(tier) == 8 and tier.fingerprint() != before
+
+    reopened = open_default(index_dir)
+    assert len(reopened) == 8 and reopened.fingerprint() == tier.fingerprint()
+    reopened.compact()
+    assert len(reopened) == 8 and not (tmp_path / "delta.f32").exists()
+    assert reopened.classify("Standup notes day 9", "Agenda, blockers and action items, next sync tuesday")["label"] == "meeting"
+
+
+def test_skip_exact_ignores_the_query_itself(tmp_path):
+    tier = KnnTier.build(INVOICES[:1] + STANDUPS, index_dir=str(tmp_path), min_votes=1)
+    email = (INVOICES[0]["subject"], INVOICES[0]["body"])
+    assert tier.classify(*email)["label"] == "finance"
+    assert tier.classify(*email, skip_exact=True) is None
+
+
+def test_no_index_means_no_tier(tmp_path):
+    assert open_default(str(tmp_path)) is None
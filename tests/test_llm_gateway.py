@@ -0,0 +1,103 @@
+import pytest
+
+from utils import llm_gateway
+from utils.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_gateway.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.is_open() and not breaker.allow()
+
+    clock.now += 10
+    assert not breaker.is_open()
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+    assert breaker.stats == {"trips": 1, "rejected": 2}
+
+
+def test_failed_probe_reopens_and_released_probe_can_be_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow() and breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.is_open()
+    assert breaker.stats["trips"] == 2
+
+
+def test_token_bucket_waits_once_overdrawn(clock):
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 3
+    assert bucket.reserve() == 0
+    bucket.adjust(5)  # the call used five more than it reserved
+    assert bucket.reserve() == pytest.approx(5.0)
+
+
+class Flaky:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def invoke(self, value):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TimeoutError("slow provider")
+        return value
+
+
+def test_gateway_retries_then_trips_the_breaker(monkeypatch):
+    monkeypatch.setattr(llm_gateway.time, "sleep", lambda seconds: None)
+    gateway = LLMGateway(max_retries=2, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    assert gateway.invoke(Flaky(failures=2), "ok") == "ok"
+
+    flaky = Flaky(failures=10)
+    with pytest.raises(LLMUnavailable):
+        gateway.invoke(flaky, "ok")
+    assert flaky.calls == 3 and not gateway.available()
+    with pytest.raises(LLMUnavailable):
+        gateway.invoke(flaky, "ok")
+    assert flaky.calls == 3
+    assert gateway.snapshot()["breaker"] == "open"
+
+
+def test_gateway_does_not_retry_bad_requests(monkeypatch):
+    monkeypatch.setattr(llm_gateway.time, "sleep", lambda seconds: None)
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    class Rejecting:
+        calls = 0
+
+        def invoke(self, value):
+            self.calls += 1
+            raise BadRequest()
+
+    gateway, runnable = LLMGateway(), Rejecting()
+    with pytest.raises(BadRequest):
+        gateway.invoke(runnable, "x")
+    assert runnable.calls == 1 and gateway.breaker.state == "closed"
@@ -0,0 +1,90 @@
+import pytest
+
+from triage.near_duplicate import NearDuplicateIndex
+from triage.triage_node import TriageNode
+
+BODY = ("Hi {name}, your order {order} has shipped and is on its way to you. Track it at "
+        "https://shop.example.com/track/{order} or reply to {name}@example.com with any questions "
+        "about delivery times, returns or the items in this order.")
+
+
+def blast(name, order):
+    return "Your order has shipped", BODY.format(name=name, order=order)
+
+
+def test_copies_of_one_blast_share_a_label():
+    index = NearDuplicateIndex()
+    index.add(index.signature(*blast("ana", 1234)), {"label": "transactional"})
+    assert index.lookup(index.signature(*blast("bo", 98765))) == {"label": "transactional"}
+    assert index.lookup(index.signature("Quarterly review", "Please send the slides for the board "
+                                        "meeting before friday so we can go through them together")) is None
+    assert index.stats["hits"] == 1 and index.stats["misses"] == 1
+
+
+def test_short_emails_are_not_compared():
+    index = NearDuplicateIndex()
+    assert index.signature("hi", "see you soon") is None
+    assert index.lookup(None) is None and index.stats["too_short"] == 1
+
+
+def test_expired_and_evicted_entries_are_not_reused(monkeypatch):
+    index = NearDuplicateIndex(ttl_seconds=10)
+    signature = index.signature(*blast("ana", 1))
+    index.add(signature, "old")
+    monkeypatch.setattr("triage.near_duplicate.time.time", lambda: 1e12)
+    assert index.lookup(signature) is None and len(index) == 0
+
+    index = NearDuplicateIndex(max_entries=1)
+    index.add(index.signature(*blast("ana", 1)), "blast")
+    index.add(index.signature("Team offsite", "We are planning the offsite for next month, please fill "
+                              "in the form with your dates and dietary needs by thursday"), "offsite")
+    assert len(index) == 1 and index.lookup(index.signature(*blast("bo", 2))) is None
+
+
+def test_group_points_copies_at_the_first_of_their_blast():
+    index = NearDuplicateIndex()
+    signatures = [index.signature(*blast("ana", 1)), None,
+                  index.signature(*blast("bo", 2)), index.signature(*blast("cy", 3))]
+    assert index.group(signatures) == [0, 1, 0, 0]
+
+
+def test_threshold_is_validated():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=10, band_rows=4)
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = []
+
+    def classify(self, subject, body):
+        self.calls.append(subject)
+        return {"label": "personal", "confidence": 0.9, "source": "llm"}
+
+    def classify_many(self, emails):
+        return [self.classify(subject, body) for subject, body in emails]
+
+
+ROTA = ("Hello {name}, the community garden volunteer rota for the spring season is ready. Plots {first} "
+        "through {last} need watering on weekday mornings and the compost bins need turning on the weekend, "
+        "so please pick the slots that suit you and bring gloves")
+
+
+def rota(name, first):
+    return {"subject": "Garden rota", "body": ROTA.format(name=name, first=first, last=first + 3), "sender": "a@b.c"}
+
+
+def test_triage_node_sends_one_copy_of_a_blast_to_the_llm():
+    node = TriageNode()
+    node.llm = CountingLLM()
+    assert node.run(rota("ana", 1))["source"] == "llm"
+    assert node.run(rota("bo", 5)) == {"final_label": "personal", "final_confidence": 0.9, "source": "near_duplicate"}
+    assert len(node.llm.calls) == 1
+
+    node = TriageNode()
+    node.llm = CountingLLM()
+    results = node.run_batch([rota("ana", 1), rota("bo", 5), rota("cy", 9)])
+    assert [r["source"] for r in results] == ["llm", "near_duplicate", "near_duplicate"]
+    assert len(node.llm.calls) == 1
@@ -0,0 +1,40 @@
+import pytest
+
+from agents.react_loop import TOOLS, ReactAgent
+from tools.cache import ToolCache
+
+SCHEDULING = ("Can we schedule a meeting?", "Let me know when you're free.")
+
+
+def test_repeated_tool_call_keeps_one_observation():
+    agent = ReactAgent(tool_cache=ToolCache(TOOLS))
+    for expected_hit in ("run", "run"):
+        trace = agent.run(*SCHEDULING)
+        ids = {step["observation_id"] for step in trace["trace"]}
+        assert ids == {"obs-1"}
+        assert list(trace["observations"]) == ["obs-1"]
+        assert trace["trace"][1]["cache_hit"] == expected_hit
+
+
+def test_second_run_served_from_shared_cache_keeps_one_observation():
+    cache = ToolCache(TOOLS)
+    agent = ReactAgent(tool_cache=cache)
+    agent.run(*SCHEDULING)
+    trace = agent.run(*SCHEDULING)
+    assert trace["trace"][0]["cache_hit"] == "shared"
+    assert {step["observation_id"] for step in trace["trace"]} == {"obs-1"}
+    assert len(trace["observations"]) == 1
+
+
+def test_trace_levels_keep_less_detail():
+    full = ReactAgent(trace_level="full", tool_cache=ToolCache(TOOLS)).run(*SCHEDULING)
+    summary = ReactAgent(trace_level="summary", tool_cache=ToolCache(TOOLS)).run(*SCHEDULING)
+    off = ReactAgent(trace_level="off", tool_cache=ToolCache(TOOLS)).run(*SCHEDULING)
+
+    assert full["final"] == summary["final"] == off["final"] is not None
+    assert "thought" in full["trace"][0] and full["observations"]
+    assert set(summary["trace"][0]) == {"step", "timestamp", "action", "tool", "cache_hit"}
+    assert summary["observations"] == {}
+    assert off["trace"] == [] and off["observations"] == {}
+    with pytest.raises(ValueError):
+        ReactAgent(trace_level="verbose")
@@ -0,0 +1,24 @@
+from dashboard.review_queue import UNLABELED, ReviewQueue
+
+
+def test_unlabeled_filter_matches_counts():
+    queue = ReviewQueue(":memory:")
+    queue.enqueue("a", {"sender": "x@example.com"}, triage={"label": "billing"})
+    queue.enqueue("b", {"sender": "y@example.com"})
+    queue.enqueue("b", {"sender": "y@example.com"})
+
+    counts = queue.counts()
+    assert counts == {"billing": 1, UNLABELED: 1}
+    rows, _ = queue.page(label=UNLABELED)
+    assert [r["item_key"] for r in rows] == ["b"]
+
+
+def test_items_are_decided_once():
+    queue = ReviewQueue(":memory:")
+    item_id = queue.enqueue("a", {}, triage={"label": "billing"})
+    assert queue.decide(item_id, "approved", reviewer="sam")
+    assert not queue.decide(item_id, "escalated")
+    assert queue.counts() == {}
+    assert queue.counts("approved") == {"billing": 1}
+    rows, _ = queue.decisions()
+    assert [(r["item_id"], r["decision"]) for r in rows] == [(item_id, "approved")]
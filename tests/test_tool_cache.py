@@ -0,0 +1,38 @@
+from tools.cache import ToolCache, tool_key
+
+
+def counting_tool(calls):
+    def tool(**kwargs):
+        calls.append(kwargs)
+        return {"args": kwargs, "items": [1, 2]}
+    return tool
+
+
+def test_hits_return_copies():
+    calls = []
+    cache = ToolCache({"t": counting_tool(calls)})
+    memo = {}
+    first, hit = cache.call("t", {"q": "a"}, memo)
+    assert hit is None
+    first["items"].append(99)
+
+    again, hit = cache.call("t", {"q": "a"}, memo)
+    assert hit == "run" and again["items"] == [1, 2]
+    again["items"].clear()
+
+    shared, hit = cache.call("t", {"q": "a"})
+    assert hit == "shared" and shared["items"] == [1, 2]
+    assert len(calls) == 1
+
+
+def test_unknown_tool_is_not_cached():
+    cache = ToolCache({})
+    result, hit = cache.call("missing", {})
+    assert hit is None and result["error"] == "Unknown tool"
+
+
+def test_key_folds_free_text_but_not_ids():
+    assert tool_key("lookup_contact", {"query": "  Alice   SMITH "}) == tool_key("lookup_contact", {"query": "alice smith"})
+    assert tool_key("read_calendar", {"user_id": "Alice", "date_hint": "Next Monday"}) == \
+        tool_key("read_calendar", {"user_id": "Alice", "date_hint": "next monday", "extra": None})
+    assert tool_key("read_calendar", {"user_id": "Alice"}) != tool_key("read_calendar", {"user_id": "alice"})
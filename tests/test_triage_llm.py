@@ -0,0 +1,33 @@
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from triage import triage_llm
+from utils.llm_gateway import LLMGateway, reset_gateway
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    model = FakeListChatModel(responses=[])
+    monkeypatch.setattr(triage_llm, "get_chat_model", lambda **kwargs: model)
+    reset_gateway(LLMGateway())
+    yield triage_llm.LLMFallbackTriage(cache=False), model
+    reset_gateway()
+
+
+def test_packed_answer_rejects_boolean_confidence(fallback):
+    llm, model = fallback
+    model.responses = [json.dumps([
+        {"id": 0, "label": "spam", "confidence": True},
+        {"id": 1, "label": "finance", "confidence": 0.8},
+        {"id": True, "label": "meeting", "confidence": 0.9},
+    ])]
+    results = llm._classify_pack([(0, "win", "prize"), (1, "invoice", "due")])
+    assert results == {1: {"label": "finance", "confidence": 0.8, "source": "llm"}}
+
+
+def test_single_answer_rejects_boolean_confidence(fallback):
+    llm, model = fallback
+    model.responses = ['{"label": "spam", "confidence": true}']
+    assert llm.classify("win", "prize")["label"] == "unknown"
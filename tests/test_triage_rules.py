@@ -0,0 +1,14 @@
+from triage.triage_rules import KeywordMatcher, TriageRules
+
+
+def test_first_category_with_a_hit_wins():
+    matcher = KeywordMatcher([("spam", ["urgent", "urgent prize"]), ("meeting", ["urgent", "meeting", "Teams"])])
+    assert matcher.match_keywords("urgent prize inside") == ("spam", ["urgent", "urgent prize"], 2)
+    assert matcher.match("the meeting on teams") == ("meeting", 1, 3)
+    assert matcher.match("nothing here") is None
+
+
+def test_classify_matches_keywords_case_insensitively():
+    rules = TriageRules(calibration=False)
+    assert rules.classify("Weekly NEWSLETTER", "To stop these emails, UNSUBSCRIBE here.")["label"] == "promotion"
+    assert rules.classify("hello", "just saying hi", "noreply@example.com")["label"] == "automated"